@@ -0,0 +1,276 @@
+"""Load test for /get_route_recommendation, runnable fully offline.
+
+By default the stub providers (see stub_providers.py) and the backend are
+started as separate processes on free ports, so no API keys or network
+access are needed and the load generator doesn't compete with the backend
+for the GIL. --in-process runs all three in this process instead, and --url
+loads an already running backend.
+
+    python bench/benchmark.py --requests 500 --concurrency 16 --distinct-trips 50
+    python bench/benchmark.py --latency-ms openai=4000 --error-rate ors=0.1
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from stub_providers import start_stub_server, add_stub_arguments, config_from_args, stub_arguments
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+
+# Seconds to wait for a subprocess to start answering requests
+STARTUP_TIMEOUT = 30
+
+# Trips are drawn from this box (around Washington DC / Baltimore)
+BBOX = (38.80, -77.20, 39.35, -76.50)
+
+VEHICLE = {
+    "type": "gasoline_vehicle",
+    "model": "toyota_camry",
+    "efficiency": 15.0,
+    "fuel_type": "gasoline"
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def backend_environment(stub_url, work_dir):
+    # Point every provider at the stubs and keep the caches out of the source tree
+    env = {
+        "ORS_BASE_URL": stub_url,
+        "EIA_BASE_URL": stub_url,
+        "OPENWEATHER_BASE_URL": stub_url,
+        "CARBON_INTERFACE_BASE_URL": stub_url,
+        "OPENAI_API_BASE": f"{stub_url}/v1",
+        "CACHE_DB_PATH": os.path.join(work_dir, "cache.sqlite3")
+    }
+    for key in ("EIA_API_KEY", "CARBON_INTERFACE_API_KEY", "WEATHER_API_KEY",
+                "OPENROUTESERVICE_API_KEY", "OPENAI_API_KEY"):
+        env[key] = "stub"
+    return env
+
+
+def wait_until_ready(url, process=None, log_path=None):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            break
+        try:
+            # Any HTTP response, even a 404, means the server is accepting requests
+            requests.get(url, timeout=1)
+            return
+        except requests.RequestException:
+            time.sleep(0.1)
+    details = f", see {log_path}" if log_path else ""
+    raise RuntimeError(f"{url} did not start within {STARTUP_TIMEOUT} s{details}")
+
+
+def start_processes(args, work_dir):
+    # Stubs and backend each get their own interpreter; output goes to log files in work_dir
+    processes = []
+    stub_port, backend_port = free_port(), free_port()
+    stub_url = f"http://127.0.0.1:{stub_port}"
+    backend_url = f"http://127.0.0.1:{backend_port}"
+
+    for name, command, cwd, env, ready_url in (
+        ("stubs", [sys.executable, "stub_providers.py", "--port", str(stub_port), *stub_arguments(args)],
+         BENCH_DIR, os.environ, stub_url),
+        ("backend", [sys.executable, "GreenAIModel.py"],
+         SRC_DIR, {**os.environ, **backend_environment(stub_url, work_dir), "PORT": str(backend_port)},
+         f"{backend_url}/metrics")
+    ):
+        log_path = os.path.join(work_dir, f"{name}.log")
+        with open(log_path, "w") as log:
+            process = subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+        processes.append(process)
+        wait_until_ready(ready_url, process, log_path)
+    return backend_url, processes
+
+
+def start_in_process(args, work_dir):
+    stub_port = free_port()
+    start_stub_server(stub_port, config_from_args(args))
+    return start_backend(f"http://127.0.0.1:{stub_port}", work_dir)
+
+
+def start_backend(stub_url, work_dir):
+    # The backend reads its configuration at import time, so set it up first
+    os.environ.update(backend_environment(stub_url, work_dir))
+
+    sys.path.insert(0, SRC_DIR)
+    from werkzeug.serving import make_server
+    from GreenAIModel import create_app
+
+    # Keep the per-request access log out of the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    port = free_port()
+    server = make_server("127.0.0.1", port, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{port}"
+
+
+def make_trips(count, seed):
+    rng = random.Random(seed)
+    south, west, north, east = BBOX
+    return [
+        {
+            "origin_coords": [rng.uniform(south, north), rng.uniform(west, east)],
+            "destination_coords": [rng.uniform(south, north), rng.uniform(west, east)]
+        }
+        for _ in range(count)
+    ]
+
+
+def parse_server_timing(header):
+    timings = {}
+    for entry in filter(None, (part.strip() for part in (header or "").split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                timings[name] = float(value)
+    return timings
+
+
+def percentile(samples, fraction):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return round(samples[min(int(len(samples) * fraction), len(samples) - 1)], 1)
+
+
+def summarize(samples):
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 0.50),
+        "p95_ms": percentile(samples, 0.95),
+        "p99_ms": percentile(samples, 0.99),
+        "max_ms": round(max(samples), 1) if samples else None
+    }
+
+
+def run_load(url, trips, total, concurrency, stream):
+    local = threading.local()
+    lock = threading.Lock()
+    next_request = iter(range(total))
+    latencies, statuses, stage_samples = [], {}, {}
+
+    def worker():
+        local.session = requests.Session()
+        while True:
+            with lock:
+                index = next(next_request, None)
+            if index is None:
+                return
+            trip = trips[index % len(trips)]
+            body = {**trip, "vehicle": VEHICLE, "api_keys": {}, "stream": stream}
+            started = time.perf_counter()
+            try:
+                response = local.session.post(f"{url}/get_route_recommendation", json=body, timeout=60)
+                response.content
+                status = response.status_code
+                timings = parse_server_timing(response.headers.get("Server-Timing"))
+            except requests.RequestException:
+                status, timings = "error", {}
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with lock:
+                latencies.append(elapsed_ms)
+                statuses[status] = statuses.get(status, 0) + 1
+                for stage, duration in timings.items():
+                    stage_samples.setdefault(stage, []).append(duration)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall_s = time.perf_counter() - started
+
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "wall_s": round(wall_s, 2),
+        "throughput_rps": round(total / wall_s, 1),
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "latency": summarize(latencies),
+        "server_timing": {stage: summarize(samples) for stage, samples in sorted(stage_samples.items())}
+    }
+
+
+def print_report(report, metrics):
+    print(f"\n{report['requests']} requests, concurrency {report['concurrency']}, {report['wall_s']} s")
+    print(f"Throughput: {report['throughput_rps']} req/s   Statuses: {report['statuses']}")
+    latency = report["latency"]
+    print(f"Latency ms: p50 {latency['p50_ms']}  p95 {latency['p95_ms']}  p99 {latency['p99_ms']}  max {latency['max_ms']}")
+
+    print("\nPer-stage (from Server-Timing)")
+    print(f"  {'stage':<14}{'count':>7}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, stats in report["server_timing"].items():
+        print(f"  {stage:<14}{stats['count']:>7}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+    if metrics:
+        print("\nProvider calls (from /metrics)")
+        for name, stats in metrics.get("providers", {}).items():
+            print(f"  {name:<18} ok {stats['successes']:<6} failed {stats['failures']:<6} "
+                  f"short-circuited {stats['short_circuited']:<6} circuit {stats['circuit_state']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Benchmark a running backend instead of starting one with stubs")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Run the stubs and the backend in this process instead of subprocesses")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=10, help="Requests sent before measuring")
+    parser.add_argument("--distinct-trips", type=int, default=50,
+                        help="Number of distinct origin/destination pairs; lower means more cache hits")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--stream", action="store_true", help="Use the streaming response mode")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    url = args.url
+    processes = []
+    try:
+        if url is None:
+            work_dir = tempfile.mkdtemp(prefix="econavix-bench-")
+            if args.in_process:
+                url = start_in_process(args, work_dir)
+            else:
+                url, processes = start_processes(args, work_dir)
+
+        trips = make_trips(args.distinct_trips, args.seed)
+        if args.warmup:
+            run_load(url, trips, args.warmup, min(args.concurrency, args.warmup), args.stream)
+        report = run_load(url, trips, args.requests, args.concurrency, args.stream)
+
+        try:
+            metrics = requests.get(f"{url}/metrics", timeout=10).json()
+        except (requests.RequestException, ValueError):
+            metrics = None
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    if args.json:
+        print(json.dumps({**report, "metrics": metrics}, indent=2))
+    else:
+        print_report(report, metrics)
@@ -0,0 +1,269 @@
+"""Local stand-ins for every upstream provider the backend calls.
+
+One HTTP server answers the OpenRouteService, EIA, OpenWeatherMap, Carbon
+Interface and OpenAI chat endpoints with synthetic but well-formed payloads.
+Latency and error rates can be set per provider to see how the service
+behaves when one of them is slow or failing.
+
+    python bench/stub_providers.py --port 8090 --latency-ms ors=150 --error-rate weather=0.05
+
+Then point the backend at it:
+
+    ORS_BASE_URL=http://localhost:8090 EIA_BASE_URL=http://localhost:8090 \\
+    OPENWEATHER_BASE_URL=http://localhost:8090 CARBON_INTERFACE_BASE_URL=http://localhost:8090 \\
+    OPENAI_API_BASE=http://localhost:8090/v1 python src/GreenAIModel.py
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+PROVIDERS = ["ors", "eia", "weather", "carbon", "openai"]
+
+# Default latency (ms) per provider, roughly what the real services take
+DEFAULT_LATENCY_MS = {
+    "ors": 250,
+    "eia": 300,
+    "weather": 120,
+    "carbon": 200,
+    "openai": 2500
+}
+
+RECOMMENDATION = ("1. Keep a steady speed and avoid hard acceleration. "
+                  "2. Check tyre pressure before the trip. "
+                  "3. Combine errands to cut total distance.")
+
+
+class StubConfig:
+    def __init__(self, latency_ms=None, jitter=0.2, error_rate=None, route_points=2000):
+        self.latency_ms = {**DEFAULT_LATENCY_MS, **(latency_ms or {})}
+        self.jitter = jitter
+        self.error_rate = {provider: 0.0 for provider in PROVIDERS}
+        self.error_rate.update(error_rate or {})
+        self.route_points = route_points
+        self.lock = threading.Lock()
+        self.calls = {provider: 0 for provider in PROVIDERS}
+
+    def delay(self, provider):
+        latency = self.latency_ms[provider] / 1000
+        time.sleep(max(latency * random.uniform(1 - self.jitter, 1 + self.jitter), 0))
+
+    def should_fail(self, provider):
+        with self.lock:
+            self.calls[provider] += 1
+        return random.random() < self.error_rate[provider]
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 6371 * 2 * math.asin(math.sqrt(a))
+
+
+def directions_payload(coordinates, points):
+    # A gently wiggling line between the two [lon, lat] points with a few steps
+    (lon1, lat1), (lon2, lat2) = coordinates[0], coordinates[-1]
+    line = []
+    for i in range(points):
+        t = i / (points - 1)
+        wiggle = math.sin(t * math.pi * 8) * 0.002
+        line.append([lon1 + (lon2 - lon1) * t + wiggle, lat1 + (lat2 - lat1) * t - wiggle])
+    distance_m = haversine_km(lat1, lon1, lat2, lon2) * 1000 * 1.25
+    steps = [{"instruction": f"Continue for {distance_m / 5000:.1f} km"} for _ in range(5)]
+    return {
+        "type": "FeatureCollection",
+        "features": [{
+            "type": "Feature",
+            "geometry": {"type": "LineString", "coordinates": line},
+            "properties": {"segments": [{
+                "distance": distance_m,
+                "duration": distance_m / 15,
+                "steps": steps
+            }]}
+        }]
+    }
+
+
+def matrix_payload(body):
+    locations = body["locations"]
+    sources = body.get("sources", range(len(locations)))
+    destinations = body.get("destinations", range(len(locations)))
+    distances, durations = [], []
+    for s in sources:
+        row_distance, row_duration = [], []
+        for d in destinations:
+            km = haversine_km(locations[s][1], locations[s][0], locations[d][1], locations[d][0]) * 1.25
+            row_distance.append(round(km, 2))
+            row_duration.append(round(km * 1000 / 15, 1))
+        distances.append(row_distance)
+        durations.append(row_duration)
+    return {"distances": distances, "durations": durations}
+
+
+def eia_payload(length):
+    rows = []
+    for week in range(min(length, 4)):
+        period = time.strftime("%Y-%m-%d", time.gmtime(time.time() - week * 7 * 86400))
+        for product, value in (("EPMR", 3.12), ("EPM0", 3.25), ("EPD2D", 3.71)):
+            rows.append({"period": period, "duoarea": "NUS", "area-name": "U.S.", "product": product,
+                         "product-name": product, "value": str(value + week * 0.01), "units": "$/GAL"})
+    return {"response": {"data": rows}}
+
+
+def weather_payload(lat, lon):
+    conditions = ["clear sky", "few clouds", "light rain", "overcast clouds"]
+    return {
+        "main": {"temp": round(15 + 10 * math.sin(lat), 1)},
+        "weather": [{"description": conditions[int(abs(lat * 10 + lon * 10)) % len(conditions)]}],
+        "wind": {"speed": round(2 + abs(math.cos(lon)) * 6, 1)}
+    }
+
+
+def make_handler(config):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_json(self):
+            length = int(self.headers.get("Content-Length", 0))
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _respond(self, provider, status, payload):
+            config.delay(provider)
+            if config.should_fail(provider):
+                self._send_json(503, {"error": f"injected {provider} failure"})
+            else:
+                self._send_json(status, payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            if url.path.startswith("/v2/petroleum/pri/gnd/data"):
+                self._respond("eia", 200, eia_payload(int(query.get("length", ["5"])[0])))
+            elif url.path == "/data/2.5/weather":
+                self._respond("weather", 200, weather_payload(float(query.get("lat", [0])[0]),
+                                                              float(query.get("lon", [0])[0])))
+            else:
+                self._send_json(404, {"error": "unknown endpoint"})
+
+        def do_POST(self):
+            body = self._read_json()
+            if re.match(r"^/v2/directions/[\w-]+/geojson$", self.path):
+                self._respond("ors", 200, directions_payload(body["coordinates"], config.route_points))
+            elif re.match(r"^/v2/matrix/[\w-]+$", self.path):
+                self._respond("ors", 200, matrix_payload(body))
+            elif self.path == "/api/v1/estimates":
+                carbon_g = int(body.get("distance_value", 0) * 180)
+                self._respond("carbon", 201, {"data": {"attributes": {"carbon_g": carbon_g}}})
+            elif self.path == "/v1/chat/completions":
+                if body.get("stream"):
+                    self._stream_chat()
+                else:
+                    self._respond("openai", 200, {
+                        "object": "chat.completion",
+                        "choices": [{"index": 0, "message": {"role": "assistant", "content": RECOMMENDATION},
+                                     "finish_reason": "stop"}]
+                    })
+            else:
+                self._send_json(404, {"error": "unknown endpoint"})
+
+        def _stream_chat(self):
+            # Server-sent events, one word per chunk, spread over the configured latency
+            if config.should_fail("openai"):
+                config.delay("openai")
+                self._send_json(503, {"error": "injected openai failure"})
+                return
+            words = RECOMMENDATION.split(" ")
+            pause = config.latency_ms["openai"] / 1000 / len(words)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            for i, word in enumerate(words):
+                time.sleep(pause)
+                chunk = {"object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+            chunk = {"object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.close_connection = True
+
+    return StubHandler
+
+
+def start_stub_server(port=8090, config=None):
+    # Serve in a background thread and return the server so callers can shut it down
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(config or StubConfig()))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_provider_values(values):
+    parsed = {}
+    for value in values or []:
+        provider, _, number = value.partition("=")
+        if provider not in PROVIDERS:
+            raise argparse.ArgumentTypeError(f"Unknown provider '{provider}', expected one of {PROVIDERS}")
+        parsed[provider] = float(number)
+    return parsed
+
+
+def add_stub_arguments(parser):
+    parser.add_argument("--latency-ms", action="append", metavar="PROVIDER=MS",
+                        help=f"Mean latency for a provider ({', '.join(PROVIDERS)})")
+    parser.add_argument("--error-rate", action="append", metavar="PROVIDER=P",
+                        help="Fraction of calls to a provider that return 503")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative latency jitter")
+    parser.add_argument("--route-points", type=int, default=2000, help="Vertices per generated route")
+
+
+def config_from_args(args):
+    return StubConfig(latency_ms=parse_provider_values(args.latency_ms),
+                      jitter=args.jitter,
+                      error_rate=parse_provider_values(args.error_rate),
+                      route_points=args.route_points)
+
+
+def stub_arguments(args):
+    # The inverse of add_stub_arguments, for starting the stubs in a subprocess
+    arguments = ["--jitter", str(args.jitter), "--route-points", str(args.route_points)]
+    for value in args.latency_ms or []:
+        arguments += ["--latency-ms", value]
+    for value in args.error_rate or []:
+        arguments += ["--error-rate", value]
+    return arguments
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8090)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, config_from_args(args))
+    print(f"Stub providers listening on http://127.0.0.1:{args.port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -131,6 +131,7 @@ function App() {
           origin_coords: originCoords,
           destination_coords: destinationCoords,
           api_keys: apiKeys,
+          stream: true,
           vehicle: {
             type: "gasoline_vehicle",
             model: "toyota_camry",
@@ -140,15 +141,23 @@ function App() {
         })
       });
 
-      const data = await response.json();
-      console.log("Route API response:", data);
-
       if (!response.ok) {
+        const data = await response.json();
         throw new Error(data.error || 'Failed to fetch route data');
       }
 
-      setRouteData(data);
-      setRoute(data.route);
+      // The route arrives first, followed by the recommendation as it is generated
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter((line) => line.trim()).forEach((line) => handleStreamMessage(JSON.parse(line)));
+      }
       setErrorMessage('');
     } catch (error) {
       console.error('Error:', error);
@@ -162,6 +171,18 @@ function App() {
     }
   };
 
+  const handleStreamMessage = (message) => {
+    if (message.type === 'route') {
+      console.log("Route API response:", message);
+      setRouteData({ ...message, recommendation: '' });
+      setRoute(message.route);
+    } else if (message.type === 'token') {
+      setRouteData((prev) => ({ ...prev, recommendation: prev.recommendation + message.content }));
+    } else if (message.type === 'recommendation') {
+      setRouteData((prev) => ({ ...prev, recommendation: message.recommendation }));
+    }
+  };
+
   const formatTime = (minutes) => {
     if (!minutes && minutes !== 0) return 'N/A';
     const hours = Math.floor(minutes / 60);
@@ -1,60 +1,188 @@
-import requests
 import openai
 import os
 import json
+import time
+import threading
+import random
+from array import array
+import gzip
+import zlib
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+import numpy as np
+from flask import Flask, Blueprint, request, jsonify, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
+from provider_client import ProviderClient
+from fuel_prices import FuelPriceStore, DEFAULT_PRODUCT, DEFAULT_AREA
+from route_cache import RouteCache, coordinate_pairs
+from emissions import estimate_emissions, emissions_kg, CalibrationStats
+from recommendation_cache import RecommendationCache
+from geometry import as_points, simplify, zoom_tolerance, encode_polyline, sample_along
+from weather_tiles import WeatherTileCache
+from stage_timings import StageMetrics, server_timing_header, mark_completed
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Routes are registered on a blueprint so create_app can build the app for any server
+bp = Blueprint("econavix", __name__)
 
 # Load environment variables from .env file
 load_dotenv()
 
-# API Keys (initially loaded from .env but can be overridden by user input)
-EIA_API_KEY = os.getenv("EIA_API_KEY")
-CARBON_INTERFACE_API_KEY = os.getenv("CARBON_INTERFACE_API_KEY")
-WEATHER_API_KEY = os.getenv("WEATHER_API_KEY")
-OPENROUTESERVICE_API_KEY = os.getenv("OPENROUTESERVICE_API_KEY")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# API Keys loaded from .env; user-provided keys override them for a single request only
+DEFAULT_CREDENTIALS = {
+    "EIA_API_KEY": os.getenv("EIA_API_KEY"),
+    "CARBON_INTERFACE_API_KEY": os.getenv("CARBON_INTERFACE_API_KEY"),
+    "WEATHER_API_KEY": os.getenv("WEATHER_API_KEY"),
+    "OPENROUTESERVICE_API_KEY": os.getenv("OPENROUTESERVICE_API_KEY"),
+    "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY")
+}
+
+# Per-stage deadlines (seconds) and the total latency budget for one recommendation request
+STAGE_TIMEOUTS = {
+    "route": float(os.getenv("ROUTE_TIMEOUT", 8)),
+    "energy": float(os.getenv("ENERGY_TIMEOUT", 3)),
+    "weather": float(os.getenv("WEATHER_TIMEOUT", 3)),
+    "emissions": float(os.getenv("EMISSIONS_TIMEOUT", 3)),
+    "llm": float(os.getenv("RECOMMENDATION_TIMEOUT", 12))
+}
+REQUEST_BUDGET = float(os.getenv("REQUEST_BUDGET", 20))
+
+# Upstream base URLs, overridable to point the service at local stubs (see bench/)
+ORS_BASE_URL = os.getenv("ORS_BASE_URL", "https://api.openrouteservice.org")
+EIA_BASE_URL = os.getenv("EIA_BASE_URL", "https://api.eia.gov")
+OPENWEATHER_BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org")
+CARBON_INTERFACE_BASE_URL = os.getenv("CARBON_INTERFACE_BASE_URL", "https://www.carboninterface.com")
+OPENAI_API_BASE = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+
+# Shared pool used to fan out the upstream provider calls of each request
+executor = ThreadPoolExecutor(max_workers=int(os.getenv("UPSTREAM_WORKERS", 16)))
+
+# One pooled keep-alive client per upstream provider
+eia_client = ProviderClient("eia")
+carbon_interface_client = ProviderClient("carbon_interface")
+weather_client = ProviderClient("openweathermap", pool_size=20)
+ors_client = ProviderClient("openrouteservice", hedge_after=float(os.getenv("ROUTE_HEDGE_AFTER", 2)))
+PROVIDER_CLIENTS = [eia_client, carbon_interface_client, weather_client, ors_client]
+
+# On-disk store shared by every worker process
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "econavix_cache.sqlite3")
+# Held by the one worker process that runs the background tasks
+BACKGROUND_LOCK_PATH = os.getenv("BACKGROUND_LOCK_PATH", f"{CACHE_DB_PATH}.lock")
+
+# Weekly fuel prices are served from the store and refreshed in the background
+fuel_price_store = FuelPriceStore(CACHE_DB_PATH, eia_client, url=f"{EIA_BASE_URL}/v2/petroleum/pri/gnd/data/",
+                                  refresh_interval=float(os.getenv("FUEL_PRICE_REFRESH_INTERVAL", 6 * 3600)))
+
+# Routes keyed on grid-snapped origin/destination, in memory and on disk
+route_cache = RouteCache(CACHE_DB_PATH,
+                         grid=float(os.getenv("ROUTE_CACHE_GRID", 0.001)),
+                         ttl=float(os.getenv("ROUTE_CACHE_TTL", 7 * 24 * 3600)),
+                         max_bytes=int(os.getenv("ROUTE_CACHE_MAX_BYTES", 64 * 1024 * 1024)))
+
+# Fraction of requests whose local emissions estimate is checked against Carbon Interface
+EMISSIONS_CALIBRATION_RATE = float(os.getenv("EMISSIONS_CALIBRATION_RATE", 0))
+emissions_calibration = CalibrationStats()
+
+# Calibration always compares the same car on both sides: the Carbon Interface
+# vehicle model (a 1993 Toyota Corolla by default) and matching local parameters
+CARBON_INTERFACE_VEHICLE_MODEL_ID = os.getenv("CARBON_INTERFACE_VEHICLE_MODEL_ID",
+                                              "7268a9b7-17e8-4c8d-acca-57059252afe9")
+CALIBRATION_VEHICLE = {
+    "type": "gasoline_vehicle",
+    "fuel_type": os.getenv("CALIBRATION_VEHICLE_FUEL_TYPE", "gasoline"),
+    "efficiency": float(os.getenv("CALIBRATION_VEHICLE_EFFICIENCY", 11.9))
+}
 
-# Set OpenAI API key
-openai.api_key = OPENAI_API_KEY
+# Batch requests: trips routed at once, and trips per ORS matrix call
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_MAX_TRIPS = int(os.getenv("BATCH_MAX_TRIPS", 1000))
+MATRIX_CHUNK_SIZE = int(os.getenv("MATRIX_CHUNK_SIZE", 50))
 
-def get_energy_data():
+# Improvements applied by the simulated optimized route
+OPTIMIZED_DURATION_FACTOR = 0.95
+OPTIMIZED_EMISSIONS_FACTOR = 0.9
+
+# LLM advice reused across near-identical trips
+recommendation_cache = RecommendationCache(max_entries=int(os.getenv("RECOMMENDATION_CACHE_SIZE", 2048)),
+                                           ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", 24 * 3600)))
+
+# Route geometry is simplified for this map zoom unless the client asks otherwise
+ROUTE_DEFAULT_ZOOM = float(os.getenv("ROUTE_DEFAULT_ZOOM", 15))
+ROUTE_TOLERANCE_PX = float(os.getenv("ROUTE_TOLERANCE_PX", 1.0))
+
+# Responses larger than this are compressed when the client accepts it
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+
+# Per-stage latencies of recommendation requests, served at /metrics
+stage_metrics = StageMetrics()
+
+# Fallback values used when a provider fails or misses its deadline
+DEFAULT_ENERGY_DATA = {
+    "price_per_gallon": 3.50,
+    "period": "latest"
+}
+DEFAULT_WEATHER_ORIGIN = {
+    "temperature": 20,
+    "weather": "clear",
+    "wind_speed": 5
+}
+DEFAULT_WEATHER_DESTINATION = {
+    "temperature": 25,
+    "weather": "clear",
+    "wind_speed": 5
+}
+RECOMMENDATION_FAILED = "Failed to generate recommendation."
+
+# Points sampled along each route, besides its origin and destination, for weather
+WEATHER_ROUTE_SAMPLES = int(os.getenv("WEATHER_ROUTE_SAMPLES", 3))
+
+def request_credentials(api_keys):
+    # Merge user-provided keys over the environment defaults without touching shared state
+    api_keys = api_keys or {}
+    return {name: api_keys.get(name) or value for name, value in DEFAULT_CREDENTIALS.items()}
+
+def get_energy_data(credentials=None):
+    credentials = credentials or DEFAULT_CREDENTIALS
     try:
-        eia_url = f"https://api.eia.gov/v2/petroleum/pri/gnd/data/?frequency=weekly&data[0]=value&sort[0][column]=period&sort[0][direction]=desc&offset=0&length=5000&api_key={EIA_API_KEY}"
-        response = requests.get(eia_url)
-        if response.status_code == 200:
-            data = response.json()
-            latest_data = data['response']['data'][0]
-            return {
-                "price_per_gallon": latest_data['value'],
-                "period": latest_data['period']
-            }
-        else:
-            print(f"Failed to get petroleum price data: {response.status_code}")
-            return None
+        # Never block on EIA: the store is kept fresh by the background refresher, and a request
+        # that brings its own EIA key refreshes an empty or stale store out of band
+        if credentials["EIA_API_KEY"] != DEFAULT_CREDENTIALS["EIA_API_KEY"]:
+            fuel_price_store.refresh_in_background(credentials["EIA_API_KEY"])
+        energy_data = fuel_price_store.latest()
+        if energy_data is None:
+            print("No petroleum price data cached yet")
+        return energy_data
     except Exception as e:
         print(f"Error in get_energy_data: {str(e)}")
         return None
 
-def calculate_emissions(distance_km):
+def calculate_emissions(distance_km, credentials=None, vehicle_model_id=CARBON_INTERFACE_VEHICLE_MODEL_ID):
+    credentials = credentials or DEFAULT_CREDENTIALS
     try:
-        url = "https://www.carboninterface.com/api/v1/estimates"
+        url = f"{CARBON_INTERFACE_BASE_URL}/api/v1/estimates"
         headers = {
-            "Authorization": f"Bearer {CARBON_INTERFACE_API_KEY}",
+            "Authorization": f"Bearer {credentials['CARBON_INTERFACE_API_KEY']}",
             "Content-Type": "application/json"
         }
         payload = {
             "type": "vehicle",
             "distance_unit": "km",
             "distance_value": distance_km,
-            "vehicle_model_id": "7268a9b7-17e8-4c8d-acca-57059252afe9"
+            "vehicle_model_id": vehicle_model_id
         }
-        response = requests.post(url, headers=headers, json=payload)
+        response = carbon_interface_client.post(url, headers=headers, json=payload, timeout=STAGE_TIMEOUTS["emissions"])
+        if response is None:
+            return None
         if response.status_code == 201:
             emissions_data = response.json()
             return {
@@ -68,10 +196,13 @@ def calculate_emissions(distance_km):
         print(f"Error in calculate_emissions: {str(e)}")
         return None
 
-def get_weather_data(location):
+def get_weather_data(lat, lon, credentials=None):
+    credentials = credentials or DEFAULT_CREDENTIALS
     try:
-        weather_url = f"http://api.openweathermap.org/data/2.5/weather?q={location}&appid={WEATHER_API_KEY}&units=metric"
-        response = requests.get(weather_url)
+        weather_url = f"{OPENWEATHER_BASE_URL}/data/2.5/weather?lat={lat}&lon={lon}&appid={credentials['WEATHER_API_KEY']}&units=metric"
+        response = weather_client.get(weather_url, timeout=STAGE_TIMEOUTS["weather"])
+        if response is None:
+            return None
         if response.status_code == 200:
             weather_data = response.json()
             return {
@@ -86,14 +217,38 @@ def get_weather_data(location):
         print(f"Error in get_weather_data: {str(e)}")
         return None
 
-def get_eco_route(origin_coords, destination_coords):
+# Weather is looked up per geohash tile so nearby points share one observation
+weather_tiles = WeatherTileCache(get_weather_data, executor,
+                                 precision=int(os.getenv("WEATHER_TILE_PRECISION", 5)),
+                                 ttl=float(os.getenv("WEATHER_TILE_TTL", 600)))
+
+def get_eco_route(origin_coords, destination_coords, profile="driving-car", credentials=None):
+    # A cache failure (e.g. a locked SQLite file) falls through to ORS and never drops a fetched route
+    key = route_cache.key(origin_coords, destination_coords, profile)
+    try:
+        route_data = route_cache.get(key)
+        if route_data is not None:
+            return route_data
+    except Exception as e:
+        print(f"Error reading route cache: {str(e)}")
+
+    route_data = fetch_eco_route(origin_coords, destination_coords, profile, credentials)
+    if route_data is not None:
+        try:
+            route_cache.put(key, route_data)
+        except Exception as e:
+            print(f"Error writing route cache: {str(e)}")
+    return route_data
+
+def fetch_eco_route(origin_coords, destination_coords, profile="driving-car", credentials=None):
+    credentials = credentials or DEFAULT_CREDENTIALS
     try:
         # Ensure coordinates are in the correct format and order for OpenRouteService
         formatted_origin = [origin_coords[1], origin_coords[0]]
         formatted_destination = [destination_coords[1], destination_coords[0]]
         
         headers = {
-            "Authorization": OPENROUTESERVICE_API_KEY,
+            "Authorization": credentials["OPENROUTESERVICE_API_KEY"],
             "Content-Type": "application/json"
         }
         
@@ -102,13 +257,16 @@ def get_eco_route(origin_coords, destination_coords):
         
         payload = {
             "coordinates": [formatted_origin, formatted_destination],
-            "profile": "driving-car"
+            "profile": profile
         }
         
         # Use the geojson endpoint as in the original code
-        ors_url = "https://api.openrouteservice.org/v2/directions/driving-car/geojson"
-        response = requests.post(ors_url, headers=headers, json=payload)
-        
+        ors_url = f"{ORS_BASE_URL}/v2/directions/{profile}/geojson"
+        response = ors_client.post(ors_url, headers=headers, json=payload, hedge=True,
+                                   timeout=STAGE_TIMEOUTS["route"])
+        if response is None:
+            return None
+
         print(f"ORS Response Status: {response.status_code}")
         if response.status_code != 200:
             print(f"ORS Error Response: {response.text}")
@@ -121,8 +279,11 @@ def get_eco_route(origin_coords, destination_coords):
             coordinates = route_feature["geometry"]["coordinates"]
             properties = route_feature["properties"]
             
-            # Convert coordinates back to [latitude, longitude] for frontend
-            converted_coordinates = [[coord[1], coord[0]] for coord in coordinates]
+            # Convert coordinates back to latitude/longitude order, packed as a flat array
+            converted_coordinates = array('d')
+            for coord in coordinates:
+                converted_coordinates.append(coord[1])
+                converted_coordinates.append(coord[0])
             
             # Extract duration in minutes and distance in km
             duration_minutes = round(properties["segments"][0]["duration"] / 60)
@@ -147,20 +308,132 @@ def get_eco_route(origin_coords, destination_coords):
             return None
             
     except Exception as e:
-        print(f"Error in get_eco_route: {str(e)}")
+        print(f"Error in fetch_eco_route: {str(e)}")
         return None
 
 def simulate_optimized_route(route_data, vehicle):
     # Simulate optimized route with improvements
     return {
         "optimized_distance_km": route_data["distance_km"],
-        "optimized_duration_minutes": round(route_data["duration_minutes"] * 0.95),
+        "optimized_duration_minutes": round(route_data["duration_minutes"] * OPTIMIZED_DURATION_FACTOR),
         "optimized_carbon_emissions": {
-            "carbon_kg": route_data["emissions"]["carbon_kg"] * 0.9
+            "carbon_kg": route_data["emissions"]["carbon_kg"] * OPTIMIZED_EMISSIONS_FACTOR
         }
     }
 
-def generate_openai_prompt(route_data, energy_data, carbon_emissions, weather_origin, weather_destination, vehicle):
+GEOMETRY_FORMATS = ("coordinates", "polyline")
+
+def geometry_error(data):
+    # Why the request's geometry options are invalid, or None if they are fine
+    try:
+        zoom = float(data.get('zoom', ROUTE_DEFAULT_ZOOM))
+    except (TypeError, ValueError):
+        zoom = None
+    if zoom is None or not np.isfinite(zoom):
+        return "'zoom' must be a number"
+    if data.get('geometry_format', 'coordinates') not in GEOMETRY_FORMATS:
+        return f"'geometry_format' must be one of {', '.join(GEOMETRY_FORMATS)}"
+    return None
+
+def geometry_options(data):
+    # Call geometry_error first; this assumes the options are valid
+    return {
+        "zoom": min(max(float(data.get('zoom', ROUTE_DEFAULT_ZOOM)), 0), 22),
+        "format": data.get('geometry_format', 'coordinates'),
+        "full": bool(data.get('full_geometry', False))
+    }
+
+def route_geometry(coordinates, options):
+    # Simplify for the requested zoom unless full resolution is asked for, then encode
+    if options["full"] and options["format"] != "polyline":
+        return {"route": coordinate_pairs(coordinates)}
+
+    points = as_points(coordinates)
+    if not options["full"]:
+        points = simplify(points, zoom_tolerance(options["zoom"], ROUTE_TOLERANCE_PX))
+
+    if options["format"] == "polyline":
+        return {"route_polyline": encode_polyline(points)}
+    return {"route": points.tolist()}
+
+def build_comparisons(distances_km, durations_minutes, vehicles):
+    # Vectorized equivalent of simulate_optimized_route plus the comparison block for many trips
+    distances_km = np.asarray(distances_km, dtype=float)
+    durations_minutes = np.asarray(durations_minutes, dtype=float)
+    carbon_kg = emissions_kg(distances_km, vehicles)
+    optimized_durations = np.round(durations_minutes * OPTIMIZED_DURATION_FACTOR)
+    optimized_carbon_kg = carbon_kg * OPTIMIZED_EMISSIONS_FACTOR
+
+    return [
+        {
+            "original": {
+                "distance_km": distance,
+                "duration_minutes": duration,
+                "carbon_emissions_kg": carbon
+            },
+            "optimized": {
+                "distance_km": distance,
+                "duration_minutes": optimized_duration,
+                "carbon_emissions_kg": optimized_carbon
+            }
+        }
+        for distance, duration, carbon, optimized_duration, optimized_carbon in zip(
+            distances_km.tolist(), durations_minutes.astype(int).tolist(), carbon_kg.tolist(),
+            optimized_durations.astype(int).tolist(), optimized_carbon_kg.tolist())
+    ]
+
+def get_route_matrix(trips, profile="driving-car", credentials=None):
+    # Distance/duration for each trip from a single ORS matrix call
+    credentials = credentials or DEFAULT_CREDENTIALS
+    try:
+        locations = []
+        for trip in trips:
+            locations.append([trip['origin_coords'][1], trip['origin_coords'][0]])
+            locations.append([trip['destination_coords'][1], trip['destination_coords'][0]])
+
+        headers = {
+            "Authorization": credentials["OPENROUTESERVICE_API_KEY"],
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "locations": locations,
+            "sources": list(range(0, len(locations), 2)),
+            "destinations": list(range(1, len(locations), 2)),
+            "metrics": ["distance", "duration"],
+            "units": "km"
+        }
+        ors_url = f"{ORS_BASE_URL}/v2/matrix/{profile}"
+        response = ors_client.post(ors_url, headers=headers, json=payload, timeout=STAGE_TIMEOUTS["route"])
+        if response is None:
+            return None
+        if response.status_code != 200:
+            print(f"ORS Matrix Error Response: {response.text}")
+            return None
+
+        matrix = response.json()
+        results = []
+        for i in range(len(trips)):
+            distance_km = matrix["distances"][i][i]
+            duration_s = matrix["durations"][i][i]
+            if distance_km is None or duration_s is None:
+                results.append(None)
+            else:
+                results.append({
+                    "distance_km": distance_km,
+                    "duration_minutes": round(duration_s / 60)
+                })
+        return results
+    except Exception as e:
+        print(f"Error in get_route_matrix: {str(e)}")
+        return None
+
+def generate_openai_prompt(route_data, energy_data, carbon_emissions, weather_origin, weather_destination, vehicle,
+                           weather_along_route=None):
+    along_route = ""
+    if weather_along_route:
+        conditions = ", ".join(dict.fromkeys(weather['weather'] for weather in weather_along_route))
+        max_wind = max(weather['wind_speed'] for weather in weather_along_route)
+        along_route = f"- Weather Along Route: {conditions}, Max Wind Speed: {max_wind} m/s\n"
     prompt = (
         f"Based on the following information:\n"
         f"- Distance: {route_data['distance_km']} km\n"
@@ -169,14 +442,19 @@ def generate_openai_prompt(route_data, energy_data, carbon_emissions, weather_or
         f"- Estimated Carbon Emissions: {carbon_emissions['carbon_kg']:.2f} kg of CO₂\n"
         f"- Weather at Origin: {weather_origin['weather']}, Temperature: {weather_origin['temperature']}°C, Wind Speed: {weather_origin['wind_speed']} m/s\n"
         f"- Weather at Destination: {weather_destination['weather']}, Temperature: {weather_destination['temperature']}°C, Wind Speed: {weather_destination['wind_speed']} m/s\n"
+        f"{along_route}"
         f"- Vehicle Type: {vehicle['type']}, Fuel Efficiency: {vehicle['efficiency']} km/l, Fuel Type: {vehicle['fuel_type']}\n"
         f"Provide a recommendation for reducing emissions and optimizing energy consumption for this route."
     )
     return prompt
 
-def get_openai_recommendation(prompt):
+def get_openai_recommendation(prompt, credentials=None):
+    # The model's answer, or None if the call failed or the answer was cut off
+    credentials = credentials or DEFAULT_CREDENTIALS
     try:
         response = openai.ChatCompletion.create(
+            api_key=credentials["OPENAI_API_KEY"],
+            api_base=OPENAI_API_BASE,
             model="gpt-4",
             messages=[
                 {"role": "system", "content": "You are an AI assistant that provides route and energy optimization advice."},
@@ -184,71 +462,223 @@ def get_openai_recommendation(prompt):
             ],
             max_tokens=200,
             n=1,
-            temperature=0.7
+            temperature=0.7,
+            request_timeout=STAGE_TIMEOUTS["llm"]
         )
-        return response['choices'][0]['message']['content'].strip()
+        choice = response['choices'][0]
+        if choice.get('finish_reason') != "stop":
+            print(f"OpenAI response ended early (finish_reason={choice.get('finish_reason')})")
+            return None
+        return choice['message']['content'].strip()
     except Exception as e:
         print(f"Error calling OpenAI API: {e}")
-        return "Failed to generate recommendation."
+        return None
 
-@app.route('/get_route_recommendation', methods=['POST'])
-def get_route_recommendation():
-    global EIA_API_KEY, CARBON_INTERFACE_API_KEY, WEATHER_API_KEY, OPENROUTESERVICE_API_KEY, OPENAI_API_KEY
+def stream_openai_recommendation(prompt, credentials=None):
+    # Yield (token, finish_reason) pairs as the model produces them; finish_reason is None
+    # until the last chunk, and the stream just ends without one if the request fails
+    credentials = credentials or DEFAULT_CREDENTIALS
+    try:
+        response = openai.ChatCompletion.create(
+            api_key=credentials["OPENAI_API_KEY"],
+            api_base=OPENAI_API_BASE,
+            model="gpt-4",
+            messages=[
+                {"role": "system", "content": "You are an AI assistant that provides route and energy optimization advice."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=200,
+            n=1,
+            temperature=0.7,
+            stream=True,
+            request_timeout=STAGE_TIMEOUTS["llm"]
+        )
+        for chunk in response:
+            choice = chunk['choices'][0]
+            yield choice['delta'].get('content'), choice.get('finish_reason')
+    except Exception as e:
+        print(f"Error streaming from OpenAI API: {e}")
+
+def recommendation_events(route_data, energy_data, carbon_emissions, weather_origin, weather_destination, vehicle,
+                          weather_along_route=None, credentials=None, stream=False, deadline=None, record=None):
+    """Recommendation for a trip, reusing the one cached for a near-identical trip.
+
+    Yields ("token", text) events as the model streams its answer (only with
+    `stream`), then one ("recommendation", text) event with the final text or
+    RECOMMENDATION_FAILED. Only answers the model finished are cached, so a
+    failed or cut-off stream never becomes the answer for later trips.
+    `record(stage, seconds)` receives the prompt and model timings.
+    """
+    key = recommendation_cache.key(route_data, carbon_emissions, weather_origin, weather_destination, vehicle)
+    recommendation = recommendation_cache.get(key)
+    if recommendation is not None:
+        yield "recommendation", recommendation
+        return
+
+    prompt_started_at = time.monotonic()
+    prompt = generate_openai_prompt(route_data, energy_data, carbon_emissions,
+                                    weather_origin, weather_destination, vehicle, weather_along_route)
+    llm_started_at = time.monotonic()
+
+    if stream:
+        tokens = []
+        finish_reason = None
+        for token, finish_reason in stream_openai_recommendation(prompt, credentials):
+            if token:
+                tokens.append(token)
+                yield "token", token
+            if deadline is not None and time.monotonic() > deadline:
+                print("Recommendation stream ran past the request budget, truncating")
+                finish_reason = None
+                break
+        recommendation = "".join(tokens).strip() if finish_reason == "stop" else None
+        if recommendation is None:
+            print(f"Recommendation stream ended early (finish_reason={finish_reason})")
+    else:
+        recommendation = get_openai_recommendation(prompt, credentials)
+
+    if record is not None:
+        record("prompt", llm_started_at - prompt_started_at)
+        record("llm", time.monotonic() - llm_started_at)
+    if recommendation:
+        recommendation_cache.put(key, recommendation)
+    yield "recommendation", recommendation or RECOMMENDATION_FAILED
+
+def get_recommendation(route_data, energy_data, carbon_emissions, weather_origin, weather_destination, vehicle,
+                       credentials=None, weather_along_route=None):
+    # Blocking form of recommendation_events, for running on the executor
+    for _, recommendation in recommendation_events(route_data, energy_data, carbon_emissions, weather_origin,
+                                                   weather_destination, vehicle, weather_along_route, credentials):
+        pass
+    return recommendation
 
+def calibrate_emissions(distance_km, credentials=None):
+    # Compare the local model with Carbon Interface for the reference car, off the request path
+    remote_emissions = calculate_emissions(distance_km, credentials)
+    if remote_emissions is not None:
+        local_emissions = estimate_emissions(distance_km, CALIBRATION_VEHICLE)
+        emissions_calibration.record(local_emissions["carbon_kg"], remote_emissions["carbon_kg"])
+
+def record_stage(stage, seconds):
+    # Concurrent lookups of the same stage count once, as the slowest of them
+    if has_request_context():
+        timings = g.setdefault("stage_timings", {})
+        timings[stage] = max(timings.get(stage, 0.0), seconds)
+
+def submit_stage(fn, *args, **kwargs):
+    # Run a stage on the shared executor, stamping its future when the work completes
+    future = executor.submit(fn, *args, **kwargs)
+    future.add_done_callback(mark_completed)
+    return future
+
+def wait_for_stage(future, stage, started_at, request_deadline, default=None, cancel=True):
+    # Wait until the stage's own deadline or the request budget runs out, whichever is first
+    deadline = min(started_at + STAGE_TIMEOUTS[stage], request_deadline)
+    try:
+        result = future.result(timeout=max(deadline - time.monotonic(), 0))
+    except concurrent.futures.TimeoutError:
+        # Shared futures (weather tiles) are left running for the other requests waiting on them
+        if cancel:
+            future.cancel()
+        print(f"Stage '{stage}' missed its deadline, using fallback")
+        return default
+    except Exception as e:
+        print(f"Error in stage '{stage}': {str(e)}")
+        return default
+    finally:
+        # From submission until the work completed (or until we gave up), not how long this thread waited
+        completed_at = getattr(future, "completed_at", None) or time.monotonic()
+        record_stage(stage, max(completed_at - started_at, 0.0))
+    return default if result is None else result
+
+def route_response_body(route_data, comparison, weather_origin, weather_destination, weather_along_route, geometry):
+    # Everything in a single-trip response except the recommendation
+    return {
+        **route_geometry(route_data["coordinates"], geometry),
+        "directions": route_data["directions"],
+        "comparison": comparison,
+        "weather": {
+            "origin": weather_origin,
+            "destination": weather_destination,
+            "along_route": weather_along_route
+        }
+    }
+
+def stream_route_recommendation(route_data, energy_data, carbon_emissions, weather_origin,
+                                weather_destination, weather_along_route, vehicle, comparison, geometry,
+                                request_deadline, credentials):
+    # Send the route and comparison right away, then the recommendation as it is generated
+    yield json.dumps({
+        "type": "route",
+        **route_response_body(route_data, comparison, weather_origin, weather_destination,
+                              weather_along_route, geometry)
+    }) + "\n"
+
+    # Headers are already sent, so these stages only show up in /metrics
+    events = recommendation_events(route_data, energy_data, carbon_emissions, weather_origin, weather_destination,
+                                   vehicle, weather_along_route, credentials, stream=True, deadline=request_deadline,
+                                   record=lambda stage, seconds: stage_metrics.record({stage: seconds}))
+    for kind, text in events:
+        if kind == "token":
+            yield json.dumps({"type": "token", "content": text}) + "\n"
+        else:
+            yield json.dumps({"type": "recommendation", "recommendation": text}) + "\n"
+
+@bp.route('/get_route_recommendation', methods=['POST'])
+def get_route_recommendation():
     try:
         data = request.json
         origin_coords = data['origin_coords']
         destination_coords = data['destination_coords']
         vehicle = data['vehicle']
+        error = geometry_error(data)
+        if error:
+            return jsonify({"error": error}), 400
         
-        api_keys = data['api_keys']  # User-provided API keys
+        credentials = request_credentials(data['api_keys'])  # User-provided API keys
 
-        # Override environment-based keys with user-provided keys, if present
-        EIA_API_KEY = api_keys.get('EIA_API_KEY') or EIA_API_KEY
-        CARBON_INTERFACE_API_KEY = api_keys.get('CARBON_INTERFACE_API_KEY') or CARBON_INTERFACE_API_KEY
-        WEATHER_API_KEY = api_keys.get('WEATHER_API_KEY') or WEATHER_API_KEY
-        OPENROUTESERVICE_API_KEY = api_keys.get('OPENROUTESERVICE_API_KEY') or OPENROUTESERVICE_API_KEY
-        OPENAI_API_KEY = api_keys.get('OPENAI_API_KEY') or OPENAI_API_KEY
+        print("Received coordinates:", origin_coords, destination_coords)
 
-        # Update OpenAI API key in OpenAI client
-        openai.api_key = OPENAI_API_KEY
+        started_at = time.monotonic()
+        request_deadline = started_at + REQUEST_BUDGET
 
-        print("Received coordinates:", origin_coords, destination_coords)
+        # Start the route and every lookup that doesn't depend on it together
+        route_future = submit_stage(get_eco_route, origin_coords, destination_coords,
+                                    credentials=credentials)
+        energy_future = submit_stage(get_energy_data, credentials)
+        weather_origin_future, weather_destination_future = weather_tiles.futures(
+            [origin_coords, destination_coords], credentials)
 
         # Get route data with directions
-        route_data = get_eco_route(origin_coords, destination_coords)
-        
+        route_data = wait_for_stage(route_future, "route", started_at, request_deadline)
+
         if route_data is None:
             return jsonify({
                 "error": "Unable to calculate route with provided coordinates"
             }), 400
 
-        # Get energy data
-        energy_data = get_energy_data() or {
-            "price_per_gallon": 3.50,
-            "period": "latest"
-        }
-        
-        # Get weather data
-        weather_origin = get_weather_data("San Francisco") or {
-            "temperature": 20,
-            "weather": "clear",
-            "wind_speed": 5
-        }
-        
-        weather_destination = get_weather_data("Los Angeles") or {
-            "temperature": 25,
-            "weather": "clear",
-            "wind_speed": 5
-        }
+        # Calculate emissions locally from the vehicle's efficiency and fuel type
+        emissions_started_at = time.monotonic()
+        carbon_emissions = estimate_emissions(route_data["distance_km"], vehicle)
+        record_stage("emissions", time.monotonic() - emissions_started_at)
+        if EMISSIONS_CALIBRATION_RATE and random.random() < EMISSIONS_CALIBRATION_RATE:
+            executor.submit(calibrate_emissions, route_data["distance_km"], credentials)
 
-        # Calculate emissions
-        carbon_emissions = calculate_emissions(route_data["distance_km"])
-        if carbon_emissions is None:
-            carbon_emissions = {
-                "carbon_g": route_data["distance_km"] * 2310,
-                "carbon_kg": route_data["distance_km"] * 2.31
-            }
+        # Sample the weather along the route; tiles already being looked up are shared
+        weather_started_at = time.monotonic()
+        along_route_futures = weather_tiles.futures(
+            sample_along(as_points(route_data["coordinates"]), WEATHER_ROUTE_SAMPLES).tolist(), credentials)
+
+        # Get energy and weather data
+        energy_data = wait_for_stage(energy_future, "energy", started_at, request_deadline,
+                                     DEFAULT_ENERGY_DATA)
+        weather_origin = wait_for_stage(weather_origin_future, "weather", started_at,
+                                        request_deadline, DEFAULT_WEATHER_ORIGIN, cancel=False)
+        weather_destination = wait_for_stage(weather_destination_future, "weather", started_at,
+                                             request_deadline, DEFAULT_WEATHER_DESTINATION, cancel=False)
+        weather_along_route = [weather for weather in (
+            wait_for_stage(future, "weather", weather_started_at, request_deadline, cancel=False)
+            for future in along_route_futures) if weather is not None]
 
         # Generate optimized route data
         optimized_route = simulate_optimized_route({
@@ -257,11 +687,6 @@ def get_route_recommendation():
             "emissions": carbon_emissions
         }, vehicle)
 
-        # Get AI recommendation
-        prompt = generate_openai_prompt(route_data, energy_data, carbon_emissions, 
-                                     weather_origin, weather_destination, vehicle)
-        recommendation = get_openai_recommendation(prompt)
-
         # Create comparison output
         comparison = {
             "original": {
@@ -276,12 +701,27 @@ def get_route_recommendation():
             }
         }
 
-        return jsonify({
-            "route": route_data["coordinates"],
-            "directions": route_data["directions"],
-            "comparison": comparison,
+        if data.get('stream'):
+            return Response(stream_with_context(stream_route_recommendation(
+                route_data, energy_data, carbon_emissions, weather_origin, weather_destination,
+                weather_along_route, vehicle, comparison, geometry_options(data), request_deadline, credentials)), mimetype="application/x-ndjson")
+
+        # Get AI recommendation, reusing one for a near-identical trip when possible
+        llm_started_at = time.monotonic()
+        recommendation_future = submit_stage(get_recommendation, route_data, energy_data, carbon_emissions,
+                                             weather_origin, weather_destination, vehicle, credentials,
+                                             weather_along_route)
+        recommendation = wait_for_stage(recommendation_future, "llm", llm_started_at,
+                                        request_deadline, RECOMMENDATION_FAILED)
+
+        serialization_started_at = time.monotonic()
+        response = jsonify({
+            **route_response_body(route_data, comparison, weather_origin, weather_destination,
+                                  weather_along_route, geometry_options(data)),
             "recommendation": recommendation
         })
+        record_stage("serialization", time.monotonic() - serialization_started_at)
+        return response
 
     except Exception as e:
         print(f"Error in route recommendation: {str(e)}")
@@ -289,5 +729,316 @@ def get_route_recommendation():
             "error": f"Internal server error: {str(e)}"
         }), 500
 
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and bool(np.isfinite(value))
+
+def is_coordinate_pair(value):
+    return isinstance(value, (list, tuple)) and len(value) == 2 and all(is_number(v) for v in value)
+
+def trip_error(trip):
+    # Why a batch trip can't be processed, or None if it is well formed
+    if not isinstance(trip, dict):
+        return "must be an object"
+    missing = [field for field in ('origin_coords', 'destination_coords', 'vehicle') if field not in trip]
+    if missing:
+        return f"is missing {', '.join(missing)}"
+    for field in ('origin_coords', 'destination_coords'):
+        if not is_coordinate_pair(trip[field]):
+            return f"has invalid {field}, expected [lat, lon]"
+    vehicle = trip['vehicle']
+    if not isinstance(vehicle, dict):
+        return "has invalid vehicle, expected an object"
+    for field in ('type', 'fuel_type'):
+        if vehicle.get(field) is not None and not isinstance(vehicle[field], str):
+            return f"has invalid vehicle {field}, expected a string"
+    if vehicle.get('efficiency') is not None and not is_number(vehicle['efficiency']):
+        return "has invalid vehicle efficiency, expected a number"
+    return None
+
+def stream_batch(trips, chunk_size, score_chunk):
+    # One JSON line per trip; a chunk that fails reports an error for each of its trips instead of ending the stream
+    for offset in range(0, len(trips), chunk_size):
+        chunk = trips[offset:offset + chunk_size]
+        try:
+            lines = [json.dumps(result) + "\n" for result in score_chunk(chunk, offset)]
+        except Exception as e:
+            print(f"Error in batch chunk starting at trip {offset}: {str(e)}")
+            lines = [json.dumps({"index": index, "error": "Failed to process trip"}) + "\n"
+                     for index in range(offset, offset + len(chunk))]
+        yield from lines
+
+def route_batch(trips, include_recommendations, energy_data, geometry, credentials):
+    # Route trips BATCH_CONCURRENCY at a time
+    return stream_batch(trips, BATCH_CONCURRENCY,
+                        lambda chunk, offset: route_chunk(chunk, offset, include_recommendations, energy_data,
+                                                          geometry, credentials))
+
+def route_chunk(chunk, offset, include_recommendations, energy_data, geometry, credentials):
+    # Route one chunk concurrently and return a result per trip, numbered from `offset`
+    started_at = time.monotonic()
+    futures = [submit_stage(get_eco_route, trip['origin_coords'], trip['destination_coords'],
+                            credentials=credentials)
+               for trip in chunk]
+    routes = [wait_for_stage(future, "route", started_at, started_at + REQUEST_BUDGET)
+              for future in futures]
+
+    routed = [(index, trip, route) for index, (trip, route) in enumerate(zip(chunk, routes), offset)
+              if route is not None]
+    comparisons = build_comparisons([route["distance_km"] for _, _, route in routed],
+                                    [route["duration_minutes"] for _, _, route in routed],
+                                    [trip['vehicle'] for _, trip, _ in routed]) if routed else []
+
+    recommendations = {}
+    if include_recommendations:
+        # Origin/destination weather for the whole chunk, one lookup per distinct tile
+        started_at = time.monotonic()
+        weather_futures = weather_tiles.futures(
+            [coords for _, trip, _ in routed for coords in (trip['origin_coords'], trip['destination_coords'])],
+            credentials)
+        weather = [wait_for_stage(future, "weather", started_at, started_at + REQUEST_BUDGET, default,
+                                  cancel=False)
+                   for future, default in zip(weather_futures,
+                                              [DEFAULT_WEATHER_ORIGIN, DEFAULT_WEATHER_DESTINATION] * len(routed))]
+
+        started_at = time.monotonic()
+        recommendation_futures = {
+            index: submit_stage(get_recommendation, route, energy_data,
+                                {"carbon_kg": comparison["original"]["carbon_emissions_kg"]},
+                                weather[2 * position], weather[2 * position + 1], trip['vehicle'], credentials)
+            for position, ((index, trip, route), comparison) in enumerate(zip(routed, comparisons))
+        }
+        recommendations = {
+            index: wait_for_stage(future, "llm", started_at, started_at + REQUEST_BUDGET,
+                                  RECOMMENDATION_FAILED)
+            for index, future in recommendation_futures.items()
+        }
+
+    comparisons_by_index = {index: comparison for (index, _, _), comparison in zip(routed, comparisons)}
+    results = []
+    for index, route in enumerate(routes, offset):
+        if route is None:
+            result = {"index": index, "error": "Unable to calculate route with provided coordinates"}
+        else:
+            result = {
+                "index": index,
+                **route_geometry(route["coordinates"], geometry),
+                "directions": route["directions"],
+                "comparison": comparisons_by_index[index]
+            }
+            if index in recommendations:
+                result["recommendation"] = recommendations[index]
+        results.append(result)
+    return results
+
+def route_batch_matrix(trips, credentials):
+    # Distance/duration-only scoring through the ORS matrix API
+    return stream_batch(trips, MATRIX_CHUNK_SIZE,
+                        lambda chunk, offset: route_matrix_chunk(chunk, offset, credentials))
+
+def route_matrix_chunk(chunk, offset, credentials):
+    # One ORS matrix call scores the whole chunk
+    routes = get_route_matrix(chunk, credentials=credentials) or [None] * len(chunk)
+
+    routed = [(index, trip, route) for index, (trip, route) in enumerate(zip(chunk, routes), offset)
+              if route is not None]
+    comparisons = build_comparisons([route["distance_km"] for _, _, route in routed],
+                                    [route["duration_minutes"] for _, _, route in routed],
+                                    [trip['vehicle'] for _, trip, _ in routed]) if routed else []
+    comparisons_by_index = {index: comparison for (index, _, _), comparison in zip(routed, comparisons)}
+
+    return [
+        {"index": index, "comparison": comparisons_by_index[index]} if route is not None
+        else {"index": index, "error": "Unable to calculate route with provided coordinates"}
+        for index, route in enumerate(routes, offset)
+    ]
+
+@bp.route('/get_route_recommendations', methods=['POST'])
+def get_route_recommendations():
+    try:
+        data = request.json
+        trips = data['trips']
+        if not isinstance(trips, list) or not trips:
+            return jsonify({"error": "'trips' must be a non-empty list"}), 400
+        if len(trips) > BATCH_MAX_TRIPS:
+            return jsonify({"error": f"At most {BATCH_MAX_TRIPS} trips per batch"}), 400
+        error = geometry_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        # Reject malformed trips before the response starts; nothing can be sent as a 400 after that
+        for index, trip in enumerate(trips):
+            error = trip_error(trip)
+            if error:
+                return jsonify({"error": f"Trip {index} {error}"}), 400
+
+        credentials = request_credentials(data.get('api_keys'))
+
+        if data.get('mode') == 'matrix':
+            lines = route_batch_matrix(trips, credentials)
+        else:
+            include_recommendations = bool(data.get('include_recommendations', False))
+
+            # Inputs shared by every trip are fetched once per batch
+            started_at = time.monotonic()
+            energy_future = submit_stage(get_energy_data, credentials)
+            energy_data = wait_for_stage(energy_future, "energy", started_at, started_at + REQUEST_BUDGET,
+                                         DEFAULT_ENERGY_DATA)
+
+            lines = route_batch(trips, include_recommendations, energy_data, geometry_options(data), credentials)
+
+        return Response(stream_with_context(lines), mimetype="application/x-ndjson")
+
+    except Exception as e:
+        print(f"Error in batch route recommendation: {str(e)}")
+        return jsonify({
+            "error": f"Internal server error: {str(e)}"
+        }), 500
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_started_at = time.monotonic()
+
+@bp.after_app_request
+def add_server_timing(response):
+    # Only requests that went through recommendation stages are timed
+    timings = g.pop("stage_timings", None)
+    if timings is None:
+        return response
+    timings["total"] = time.monotonic() - g.request_started_at
+    stage_metrics.record(timings)
+    response.headers["Server-Timing"] = server_timing_header(timings)
+    response.headers["Timing-Allow-Origin"] = "*"
+    return response
+
+def gzip_stream(chunks):
+    # Compress a streamed body chunk by chunk, flushing each one so NDJSON lines still arrive as they are produced
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode()
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+@bp.after_app_request
+def compress_response(response):
+    # Brotli when available and accepted, gzip otherwise; streamed NDJSON is gzipped as it is sent
+    accepted = request.headers.get('Accept-Encoding', '')
+    if (response.direct_passthrough or 'Content-Encoding' in response.headers
+            or response.status_code < 200 or response.status_code >= 300):
+        return response
+
+    if response.is_streamed:
+        if response.mimetype != "application/x-ndjson" or 'gzip' not in accepted:
+            return response
+        response.response = gzip_stream(response.response)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.headers.pop('Content-Length', None)
+        response.headers.add('Vary', 'Accept-Encoding')
+        return response
+
+    body = response.get_data()
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return response
+
+    if brotli is not None and 'br' in accepted:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in accepted:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        return response
+    response.headers.add('Vary', 'Accept-Encoding')
+    return response
+
+@bp.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify({
+        "stages": stage_metrics.stats(),
+        "providers": {client.name: client.stats() for client in PROVIDER_CLIENTS}
+    })
+
+@bp.route('/provider_stats', methods=['GET'])
+def provider_stats():
+    return jsonify({client.name: client.stats() for client in PROVIDER_CLIENTS})
+
+@bp.route('/fuel_prices', methods=['GET'])
+def fuel_prices():
+    product = request.args.get('product', DEFAULT_PRODUCT)
+    area = request.args.get('area', DEFAULT_AREA)
+    period = request.args.get('period')
+
+    if period is not None:
+        price = fuel_price_store.lookup(period=period, product=product, area=area)
+        if price is None:
+            return jsonify({"error": f"No price recorded on or before {period}"}), 404
+        return jsonify(price)
+
+    return jsonify(fuel_price_store.history(product=product, area=area,
+                                            start=request.args.get('start'),
+                                            end=request.args.get('end')))
+
+@bp.route('/route_cache_stats', methods=['GET'])
+def route_cache_stats():
+    return jsonify(route_cache.stats())
+
+@bp.route('/weather_cache_stats', methods=['GET'])
+def weather_cache_stats():
+    return jsonify(weather_tiles.stats())
+
+@bp.route('/recommendation_cache_stats', methods=['GET'])
+def recommendation_cache_stats():
+    return jsonify(recommendation_cache.stats())
+
+@bp.route('/emissions_calibration', methods=['GET'])
+def emissions_calibration_stats():
+    return jsonify({
+        **emissions_calibration.stats(),
+        "vehicle_model_id": CARBON_INTERFACE_VEHICLE_MODEL_ID,
+        "local_vehicle": CALIBRATION_VEHICLE
+    })
+
+def run_background_tasks():
+    # Keep the fuel price store fresh, purge expired routes and warm the route cache without delaying startup
+    if DEFAULT_CREDENTIALS["EIA_API_KEY"]:
+        fuel_price_store.start_background_refresh(DEFAULT_CREDENTIALS["EIA_API_KEY"])
+    route_cache.start_background_purge(float(os.getenv("ROUTE_CACHE_PURGE_INTERVAL", 3600)))
+    if os.getenv("ROUTE_CACHE_PREWARM_FILE"):
+        threading.Thread(target=route_cache.prewarm,
+                         args=(os.getenv("ROUTE_CACHE_PREWARM_FILE"), fetch_eco_route),
+                         daemon=True).start()
+
+background_lock_file = None
+
+def start_background_tasks():
+    # Every worker calls this, but only the one holding the lock file runs the tasks.
+    # The others wait on the lock and take over if that worker exits.
+    if fcntl is None:
+        run_background_tasks()
+        return
+
+    def wait_for_lock():
+        global background_lock_file
+        lock_file = open(BACKGROUND_LOCK_PATH, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except OSError as e:
+            print(f"Error locking {BACKGROUND_LOCK_PATH}, background tasks not started: {str(e)}")
+            lock_file.close()
+            return
+        background_lock_file = lock_file
+        print(f"Worker {os.getpid()} is running the background tasks")
+        run_background_tasks()
+
+    threading.Thread(target=wait_for_lock, name="background-lock", daemon=True).start()
+
+def create_app():
+    # Build the Flask app; called once per worker process by the production server (see wsgi.py)
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(bp)
+    start_background_tasks()
+    return app
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5050)
+    # Development server; use wsgi.py with gunicorn in production
+    create_app().run(host="0.0.0.0", port=int(os.getenv("PORT", 5050)), threaded=True)
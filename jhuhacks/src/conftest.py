@@ -0,0 +1,21 @@
+import time
+
+import pytest
+
+
+class FakeClock:
+    """Stands in for time.time and time.monotonic; tests move `now` by hand."""
+
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(time, "time", clock)
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+# Tailpipe kg of CO₂ per unit of fuel burned (litres, or kWh for electric
+# vehicles, where the factor is the average grid intensity)
+EMISSION_FACTORS = {
+    "gasoline": 2.31,
+    "diesel": 2.68,
+    "e85": 1.61,
+    "lpg": 1.51,
+    "electric": 0.39
+}
+DEFAULT_FUEL_TYPE = "gasoline"
+
+# Fuel efficiency (km per litre, km per kWh for electric) assumed per vehicle
+# class when the client doesn't send one
+DEFAULT_EFFICIENCY = {
+    "gasoline_vehicle": 12.0,
+    "diesel_vehicle": 14.0,
+    "hybrid_vehicle": 20.0,
+    "electric_vehicle": 6.5,
+    "van": 9.0,
+    "truck": 3.5
+}
+FALLBACK_EFFICIENCY = 12.0
+
+# Fuel assumed per vehicle class when the client doesn't send one
+DEFAULT_FUEL_BY_CLASS = {
+    "diesel_vehicle": "diesel",
+    "electric_vehicle": "electric",
+    "truck": "diesel"
+}
+
+
+def vehicle_parameters(vehicle):
+    # (efficiency, kg CO₂ per unit of fuel); anything missing or malformed falls back to the class defaults
+    vehicle = vehicle if isinstance(vehicle, dict) else {}
+    vehicle_class = vehicle.get("type") if isinstance(vehicle.get("type"), str) else None
+    fuel_type = vehicle.get("fuel_type")
+    if not isinstance(fuel_type, str) or not fuel_type:
+        fuel_type = DEFAULT_FUEL_BY_CLASS.get(vehicle_class, DEFAULT_FUEL_TYPE)
+    fuel_type = fuel_type.lower()
+    try:
+        efficiency = float(vehicle.get("efficiency") or 0)
+    except (TypeError, ValueError):
+        efficiency = 0
+    if not 0 < efficiency < float("inf"):
+        efficiency = DEFAULT_EFFICIENCY.get(vehicle_class, FALLBACK_EFFICIENCY)
+    return efficiency, EMISSION_FACTORS.get(fuel_type, EMISSION_FACTORS[DEFAULT_FUEL_TYPE])
+
+
+def emissions_kg(distances_km, vehicles):
+    """kg of CO₂ for each distance/vehicle pair.
+
+    `distances_km` and `vehicles` are broadcast against each other, so one
+    vehicle can be scored over many routes or many vehicles over one route.
+    """
+    if isinstance(vehicles, dict):
+        vehicles = [vehicles]
+    parameters = np.array([vehicle_parameters(vehicle) for vehicle in vehicles], dtype=float)
+    efficiency, factor = parameters[:, 0], parameters[:, 1]
+    return np.asarray(distances_km, dtype=float) / efficiency * factor
+
+
+def estimate_emissions(distance_km, vehicle):
+    carbon_kg = float(emissions_kg(distance_km, vehicle)[0])
+    return {
+        "carbon_g": carbon_kg * 1000,
+        "carbon_kg": carbon_kg
+    }
+
+
+class CalibrationStats:
+    """Running comparison of local estimates against a remote reference."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = 0
+        self.ratio_sum = 0.0
+        self.last = None
+
+    def record(self, local_kg, remote_kg):
+        if local_kg <= 0:
+            return
+        with self.lock:
+            self.samples += 1
+            self.ratio_sum += remote_kg / local_kg
+            self.last = {"local_kg": local_kg, "remote_kg": remote_kg}
+
+    def stats(self):
+        with self.lock:
+            return {
+                "samples": self.samples,
+                "mean_remote_to_local_ratio": round(self.ratio_sum / self.samples, 4) if self.samples else None,
+                "last": self.last
+            }
@@ -0,0 +1,197 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+EIA_URL = "https://api.eia.gov/v2/petroleum/pri/gnd/data/"
+
+# Regular gasoline, U.S. average
+DEFAULT_PRODUCT = "EPMR"
+DEFAULT_AREA = "NUS"
+
+
+class FuelPriceStore:
+    """Weekly EIA retail fuel prices kept in a SQLite file shared by all workers.
+
+    Route requests only ever read from the store. A background thread keeps it
+    up to date, fetching just the tracked product/area series and only the rows
+    newer than the latest stored period, so the EIA API is never on the request
+    path. After a failed refresh with a given API key it waits `retry_interval`
+    before trying that key again; other keys are not held back.
+    """
+
+    def __init__(self, db_path, client, url=EIA_URL, products=(DEFAULT_PRODUCT,), areas=(DEFAULT_AREA,),
+                 refresh_interval=6 * 3600, retry_interval=900, page_size=500, timeout=10):
+        self.db_path = db_path
+        self.client = client
+        self.url = url
+        self.products = list(products)
+        self.areas = list(areas)
+        self.refresh_interval = refresh_interval
+        self.retry_interval = retry_interval
+        self.page_size = page_size
+        self.timeout = timeout
+        self.refresh_lock = threading.Lock()
+        self.refresher = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS fuel_prices ("
+                " product TEXT, duoarea TEXT, period TEXT, value REAL,"
+                " product_name TEXT, area_name TEXT, units TEXT,"
+                " PRIMARY KEY (product, duoarea, period))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS fuel_prices_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=self.timeout)
+
+    def latest(self, product=DEFAULT_PRODUCT, area=DEFAULT_AREA):
+        return self.lookup(product=product, area=area)
+
+    def lookup(self, period=None, product=DEFAULT_PRODUCT, area=DEFAULT_AREA):
+        # Price for the given week (or the most recent one on or before it)
+        query = "SELECT value, period FROM fuel_prices WHERE product = ? AND duoarea = ?"
+        params = [product, area]
+        if period is not None:
+            query += " AND period <= ?"
+            params.append(period)
+        query += " ORDER BY period DESC LIMIT 1"
+        with self._connect() as conn:
+            row = conn.execute(query, params).fetchone()
+        if row is None:
+            return None
+        return {
+            "price_per_gallon": row[0],
+            "period": row[1]
+        }
+
+    def history(self, product=DEFAULT_PRODUCT, area=DEFAULT_AREA, start=None, end=None):
+        query = "SELECT period, value FROM fuel_prices WHERE product = ? AND duoarea = ?"
+        params = [product, area]
+        if start is not None:
+            query += " AND period >= ?"
+            params.append(start)
+        if end is not None:
+            query += " AND period <= ?"
+            params.append(end)
+        query += " ORDER BY period"
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [{"period": period, "price_per_gallon": value} for period, value in rows]
+
+    def _meta(self, key):
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM fuel_prices_meta WHERE key = ?", (key,)).fetchone()
+        return float(row[0]) if row else 0.0
+
+    def _set_meta(self, key, value):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO fuel_prices_meta VALUES (?, ?)", (key, str(value)))
+
+    def last_refreshed(self):
+        return self._meta("last_refreshed")
+
+    def is_stale(self):
+        return time.time() - self.last_refreshed() >= self.refresh_interval
+
+    @staticmethod
+    def _failure_key(api_key):
+        # Failed attempts are tracked per API key, stored as a hash rather than the key itself
+        return "last_failed:" + hashlib.sha256(api_key.encode()).hexdigest()[:16]
+
+    def _record_failure(self, api_key):
+        try:
+            self._set_meta(self._failure_key(api_key), time.time())
+        except Exception as e:
+            print(f"Error recording failed fuel price refresh: {str(e)}")
+
+    def is_due(self, api_key):
+        # Stale, and this key is not inside the back-off window of a failed attempt
+        return (self.is_stale()
+                and time.time() - self._meta(self._failure_key(api_key)) >= self.retry_interval)
+
+    def refresh(self, api_key, force=False):
+        # Another thread (or worker process) may have refreshed in the meantime
+        if not api_key or not self.refresh_lock.acquire(blocking=False):
+            return False
+        try:
+            if not force and not self.is_due(api_key):
+                return False
+
+            with self._connect() as conn:
+                row = conn.execute("SELECT MAX(period) FROM fuel_prices").fetchone()
+            newest_period = row[0] if row else None
+
+            params = {
+                "api_key": api_key,
+                "frequency": "weekly",
+                "data[0]": "value",
+                "facets[product][]": self.products,
+                "facets[duoarea][]": self.areas,
+                "sort[0][column]": "period",
+                "sort[0][direction]": "desc",
+                "length": self.page_size
+            }
+            if newest_period is not None:
+                params["start"] = newest_period
+
+            # Page until a short page comes back so no week is skipped
+            rows = []
+            offset = 0
+            while True:
+                response = self.client.get(self.url, params={**params, "offset": offset}, timeout=self.timeout)
+                if response is None:
+                    self._record_failure(api_key)
+                    return False
+                if response.status_code != 200:
+                    print(f"Failed to refresh petroleum price data: {response.status_code}")
+                    self._record_failure(api_key)
+                    return False
+
+                page = response.json()["response"]["data"]
+                rows.extend(
+                    (r["product"], r["duoarea"], r["period"], float(r["value"]),
+                     r.get("product-name"), r.get("area-name"), r.get("units"))
+                    for r in page
+                    if r.get("value") is not None
+                )
+                if len(page) < self.page_size:
+                    break
+                offset += self.page_size
+
+            with self._connect() as conn:
+                conn.executemany("INSERT OR REPLACE INTO fuel_prices VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                conn.execute("INSERT OR REPLACE INTO fuel_prices_meta VALUES ('last_refreshed', ?)",
+                             (str(time.time()),))
+            print(f"Refreshed fuel prices: {len(rows)} rows since {newest_period or 'start'}")
+            return True
+        except Exception as e:
+            print(f"Error refreshing fuel prices: {str(e)}")
+            self._record_failure(api_key)
+            return False
+        finally:
+            self.refresh_lock.release()
+
+    def refresh_in_background(self, api_key):
+        # One-off refresh off the request path, e.g. with a key a user sent; at most one runs at a time
+        if not api_key or self.refresh_lock.locked() or not self.is_due(api_key):
+            return False
+        threading.Thread(target=self.refresh, args=(api_key,), name="fuel-price-refresh-once", daemon=True).start()
+        return True
+
+    def start_background_refresh(self, api_key, check_interval=300):
+        if self.refresher is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.refresh(api_key)
+                except Exception as e:
+                    print(f"Error in fuel price refresher: {str(e)}")
+                time.sleep(check_interval)
+
+        self.refresher = threading.Thread(target=run, name="fuel-price-refresh", daemon=True)
+        self.refresher.start()
@@ -0,0 +1,80 @@
+import numpy as np
+
+# Web Mercator tiles are 256px wide and span 360° of longitude at zoom 0
+TILE_SIZE = 256
+
+
+def as_points(coordinates):
+    # View a flat [lat0, lon0, lat1, lon1, ...] array as an (n, 2) NumPy array without copying
+    return np.frombuffer(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def zoom_tolerance(zoom, tolerance_px=1.0):
+    # Degrees covered by `tolerance_px` screen pixels at the given map zoom
+    return tolerance_px * 360.0 / (TILE_SIZE * 2 ** zoom)
+
+
+def simplify(points, tolerance):
+    """Douglas–Peucker simplification of an (n, 2) array of points.
+
+    Segments are processed from an explicit stack instead of recursion, and
+    the distances of every point in a segment to its chord are computed in
+    one vectorized step.
+    """
+    n = len(points)
+    if n < 3 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        a = points[start]
+        chord = points[end] - a
+        offsets = points[start + 1:end] - a
+        length = np.hypot(chord[0], chord[1])
+        if length == 0:
+            distances = np.hypot(offsets[:, 0], offsets[:, 1])
+        else:
+            distances = np.abs(chord[0] * offsets[:, 1] - chord[1] * offsets[:, 0]) / length
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = start + 1 + farthest
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return points[keep]
+
+
+def encode_polyline(points, precision=5):
+    # Google encoded polyline format of an (n, 2) array of lat/lon points
+    scaled = np.round(np.asarray(points) * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1f)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
+
+
+def sample_along(points, count):
+    # `count` points spaced evenly by distance along the route, excluding its endpoints
+    if count <= 0 or len(points) < 2:
+        return points[:0]
+    steps = np.hypot(*np.diff(points, axis=0).T)
+    travelled = np.concatenate(([0.0], np.cumsum(steps)))
+    targets = np.linspace(0, travelled[-1], count + 2)[1:-1]
+    ends = np.clip(np.searchsorted(travelled, targets, side="right"), 1, len(points) - 1)
+    lengths = steps[ends - 1]
+    fractions = np.divide(targets - travelled[ends - 1], lengths, out=np.zeros_like(targets), where=lengths > 0)
+    return points[ends - 1] + fractions[:, None] * (points[ends] - points[ends - 1])
@@ -0,0 +1,15 @@
+import multiprocessing
+import os
+
+# Each worker is a separate process with its own provider clients and caches;
+# the SQLite stores are shared between them
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', 5050)}")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+
+# Threaded workers so streamed responses and slow upstreams don't block a whole process
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", 8))
+
+# Streaming responses can outlive the default 30s while the LLM is still generating
+timeout = int(os.getenv("WEB_TIMEOUT", 60))
+keepalive = 5
@@ -0,0 +1,183 @@
+import random
+import threading
+import time
+import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying; anything else is returned to the caller as-is
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# Threads used to fire hedged requests
+hedge_executor = ThreadPoolExecutor(max_workers=8)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures and lets a single
+    trial request through once `reset_timeout` seconds have passed."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class ProviderClient:
+    """Keep-alive HTTP client for one upstream provider.
+
+    Each client owns its own connection pool, retries transient failures with
+    jittered exponential backoff, can hedge slow requests and stops calling the
+    provider while its circuit breaker is open. `request` returns None whenever
+    no response could be obtained so callers fall back to their default values.
+    """
+
+    def __init__(self, name, pool_size=10, retries=2, backoff=0.2, hedge_after=None,
+                 failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.lock = threading.Lock()
+        self.successes = 0
+        self.failures = 0
+        self.short_circuited = 0
+        self.retried = 0
+        self.hedged = 0
+        self.latencies = []
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method, url, hedge=False, **kwargs):
+        if not self.breaker.allow():
+            with self.lock:
+                self.short_circuited += 1
+            print(f"Circuit open for {self.name}, skipping request")
+            return None
+
+        started = time.monotonic()
+        response = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                with self.lock:
+                    self.retried += 1
+                time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+            try:
+                if hedge and self.hedge_after is not None:
+                    response = self._hedged_send(method, url, **kwargs)
+                else:
+                    response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                print(f"{self.name} request failed (attempt {attempt + 1}): {str(e)}")
+                response = None
+                continue
+            if response.status_code not in RETRYABLE_STATUS:
+                break
+
+        self._record(response, time.monotonic() - started)
+        return response
+
+    def _hedged_send(self, method, url, **kwargs):
+        # Fire a second identical request if the first is slower than `hedge_after`
+        # and use whichever finishes first
+        first = hedge_executor.submit(self.session.request, method, url, **kwargs)
+        try:
+            return first.result(timeout=self.hedge_after)
+        except concurrent.futures.TimeoutError:
+            pass
+
+        with self.lock:
+            self.hedged += 1
+        second = hedge_executor.submit(self.session.request, method, url, **kwargs)
+        pending = {first, second}
+        error = None
+        while pending:
+            done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except requests.RequestException as e:
+                    error = e
+        raise error
+
+    def _record(self, response, latency):
+        failed = response is None or response.status_code in RETRYABLE_STATUS
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+        with self.lock:
+            if failed:
+                self.failures += 1
+            else:
+                self.successes += 1
+            self.latencies.append(latency)
+            if len(self.latencies) > 1000:
+                del self.latencies[:500]
+
+    def stats(self):
+        with self.lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                "successes": self.successes,
+                "failures": self.failures,
+                "short_circuited": self.short_circuited,
+                "retried": self.retried,
+                "hedged": self.hedged,
+                "circuit_state": self.breaker.state
+            }
+        if latencies:
+            stats["latency_ms"] = {
+                "avg": round(sum(latencies) / len(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)] * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1)
+            }
+        return stats
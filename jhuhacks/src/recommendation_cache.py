@@ -0,0 +1,66 @@
+import threading
+import time
+from bisect import bisect
+from collections import OrderedDict
+
+# Band edges used to bucket trips; trips falling in the same bands share advice
+DISTANCE_BANDS_KM = [5, 15, 40, 100, 250, 600]
+EMISSIONS_BANDS_KG = [1, 3, 8, 20, 50, 120]
+
+
+class RecommendationCache:
+    """In-process LRU of LLM recommendations keyed on a bucketed trip.
+
+    The key is built from the same inputs `generate_openai_prompt` uses,
+    reduced to a distance band, an emissions band, the weather conditions at
+    both ends and the vehicle type, so near-identical trips reuse one
+    recommendation instead of calling the model again.
+    """
+
+    def __init__(self, max_entries=2048, ttl=24 * 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(route_data, carbon_emissions, weather_origin, weather_destination, vehicle):
+        return (
+            bisect(DISTANCE_BANDS_KM, route_data["distance_km"]),
+            bisect(EMISSIONS_BANDS_KG, carbon_emissions["carbon_kg"]),
+            str(weather_origin["weather"]).lower(),
+            str(weather_destination["weather"]).lower(),
+            str(vehicle.get("type")),
+            str(vehicle.get("fuel_type")).lower()
+        )
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, recommendation):
+        with self.lock:
+            self.entries[key] = (time.time(), recommendation)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+                "entries": len(self.entries)
+            }
@@ -0,0 +1,189 @@
+import json
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def coordinate_pairs(coordinates):
+    # Expand a flat [lat0, lon0, lat1, lon1, ...] array into (lat, lon) pairs
+    return list(zip(coordinates[0::2], coordinates[1::2]))
+
+
+class RouteCache:
+    """Two-tier cache of routing results.
+
+    Keys are the origin and destination snapped to a `grid`-degree grid plus
+    the routing profile, so repeated commutes share one entry. Recently used
+    routes live in an in-process LRU bounded by `max_bytes`; every route is
+    also written to a SQLite table that outlives the process and is shared by
+    all workers. Both tiers expire entries after `ttl` seconds.
+
+    Route coordinates are kept as a flat `array('d')` of lat/lon values rather
+    than lists of lists, which is both smaller in memory and stored as a
+    single blob on disk.
+    """
+
+    def __init__(self, db_path, grid=0.001, ttl=7 * 24 * 3600, max_bytes=64 * 1024 * 1024, timeout=10):
+        self.db_path = db_path
+        self.grid = grid
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.purger = None
+
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS routes ("
+                " key TEXT PRIMARY KEY, created REAL, distance_km REAL,"
+                " duration_minutes INTEGER, coordinates BLOB, directions TEXT)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=self.timeout)
+
+    def key(self, origin_coords, destination_coords, profile):
+        cells = [round(value / self.grid) for value in (*origin_coords[:2], *destination_coords[:2])]
+        return f"{profile}:" + ":".join(str(cell) for cell in cells)
+
+    @staticmethod
+    def _size(route):
+        return (sys.getsizeof(route["coordinates"])
+                + sum(sys.getsizeof(direction) for direction in route["directions"]) + 256)
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                created, route, size = entry
+                if now - created < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return route
+                del self.entries[key]
+                self.current_bytes -= size
+                self.expirations += 1
+
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT created, distance_km, duration_minutes, coordinates, directions FROM routes WHERE key = ?",
+                (key,)
+            ).fetchone()
+        if row is None or now - row[0] >= self.ttl:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        coordinates = array('d')
+        coordinates.frombytes(row[3])
+        route = {
+            "distance_km": row[1],
+            "duration_minutes": row[2],
+            "coordinates": coordinates,
+            "directions": json.loads(row[4])
+        }
+        self._remember(key, route, row[0])
+        with self.lock:
+            self.disk_hits += 1
+        return route
+
+    def put(self, key, route):
+        created = time.time()
+        self._remember(key, route, created)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?, ?)",
+                (key, created, route["distance_km"], route["duration_minutes"],
+                 route["coordinates"].tobytes(), json.dumps(route["directions"]))
+            )
+
+    def _remember(self, key, route, created):
+        size = self._size(route)
+        if size > self.max_bytes:
+            return
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.current_bytes -= previous[2]
+            self.entries[key] = (created, route, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, (_, _, evicted_size) = self.entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    def purge_expired(self):
+        cutoff = time.time() - self.ttl
+        with self.lock:
+            for key in [key for key, (created, _, _) in self.entries.items() if created < cutoff]:
+                self.current_bytes -= self.entries.pop(key)[2]
+                self.expirations += 1
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM routes WHERE created < ?", (cutoff,)).rowcount
+        return removed
+
+    def start_background_purge(self, interval=3600):
+        if self.purger is not None:
+            return
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    removed = self.purge_expired()
+                    if removed:
+                        print(f"Purged {removed} expired routes")
+                except Exception as e:
+                    print(f"Error purging expired routes: {str(e)}")
+
+        self.purger = threading.Thread(target=run, name="route-cache-purge", daemon=True)
+        self.purger.start()
+
+    def prewarm(self, path, fetch_route, profile="driving-car"):
+        # Each non-comment line of `path` holds "origin_lat,origin_lon,destination_lat,destination_lon"
+        warmed = 0
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                try:
+                    values = [float(value) for value in line.split(",")[:4]]
+                    origin_coords, destination_coords = values[:2], values[2:]
+                    key = self.key(origin_coords, destination_coords, profile)
+                    if self.get(key) is None:
+                        route = fetch_route(origin_coords, destination_coords, profile)
+                        if route is not None:
+                            self.put(key, route)
+                            warmed += 1
+                except Exception as e:
+                    print(f"Error pre-warming route '{line}': {str(e)}")
+        print(f"Pre-warmed {warmed} routes from {path}")
+        return warmed
+
+    def stats(self):
+        with self.lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "entries": len(self.entries),
+                "memory_bytes": self.current_bytes
+            }
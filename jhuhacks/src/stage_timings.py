@@ -0,0 +1,59 @@
+import threading
+import time
+from collections import deque
+
+
+def mark_completed(future):
+    # Done callback stamping when the work finished, which can be well before anyone waits on it
+    future.completed_at = time.monotonic()
+
+
+def server_timing_header(timings):
+    # Server-Timing header value, durations in milliseconds
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items())
+
+
+class StageMetrics:
+    """Per-stage latency aggregates across requests.
+
+    Counts and totals cover every request; percentiles are computed over the
+    most recent `sample_size` timings of each stage.
+    """
+
+    def __init__(self, sample_size=2048):
+        self.sample_size = sample_size
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.counts = {}
+        self.totals = {}
+
+    def record(self, timings):
+        with self.lock:
+            for stage, seconds in timings.items():
+                if stage not in self.samples:
+                    self.samples[stage] = deque(maxlen=self.sample_size)
+                    self.counts[stage] = 0
+                    self.totals[stage] = 0.0
+                self.samples[stage].append(seconds)
+                self.counts[stage] += 1
+                self.totals[stage] += seconds
+
+    def stats(self):
+        with self.lock:
+            snapshot = {stage: (sorted(samples), self.counts[stage], self.totals[stage])
+                        for stage, samples in self.samples.items()}
+
+        def percentile(samples, fraction):
+            return round(samples[min(int(len(samples) * fraction), len(samples) - 1)] * 1000, 1)
+
+        return {
+            stage: {
+                "count": count,
+                "avg_ms": round(total / count * 1000, 1),
+                "p50_ms": percentile(samples, 0.50),
+                "p95_ms": percentile(samples, 0.95),
+                "p99_ms": percentile(samples, 0.99),
+                "max_ms": round(samples[-1] * 1000, 1)
+            }
+            for stage, (samples, count, total) in snapshot.items()
+        }
@@ -0,0 +1,73 @@
+import pytest
+
+from emissions import (CalibrationStats, DEFAULT_EFFICIENCY, EMISSION_FACTORS, FALLBACK_EFFICIENCY,
+                       emissions_kg, estimate_emissions, vehicle_parameters)
+
+
+@pytest.mark.parametrize("fuel_type", sorted(EMISSION_FACTORS))
+def test_factor_per_fuel(fuel_type):
+    assert vehicle_parameters({"fuel_type": fuel_type, "efficiency": 10})[1] == EMISSION_FACTORS[fuel_type]
+
+
+def test_fuel_type_is_case_insensitive():
+    assert vehicle_parameters({"fuel_type": "Diesel"})[1] == EMISSION_FACTORS["diesel"]
+
+
+@pytest.mark.parametrize("vehicle_class", sorted(DEFAULT_EFFICIENCY))
+def test_default_efficiency_per_class(vehicle_class):
+    assert vehicle_parameters({"type": vehicle_class})[0] == DEFAULT_EFFICIENCY[vehicle_class]
+
+
+def test_fuel_defaults_by_class():
+    assert vehicle_parameters({"type": "electric_vehicle"})[1] == EMISSION_FACTORS["electric"]
+    assert vehicle_parameters({"type": "truck"})[1] == EMISSION_FACTORS["diesel"]
+    assert vehicle_parameters({"type": "van"})[1] == EMISSION_FACTORS["gasoline"]
+
+
+@pytest.mark.parametrize("vehicle", [
+    None,
+    "car",
+    {},
+    {"type": ["car"], "fuel_type": 5, "efficiency": "fast"},
+    {"fuel_type": "", "efficiency": -3},
+    {"efficiency": float("nan")},
+])
+def test_malformed_vehicles_fall_back_to_defaults(vehicle):
+    assert vehicle_parameters(vehicle) == (FALLBACK_EFFICIENCY, EMISSION_FACTORS["gasoline"])
+
+
+def test_unknown_fuel_uses_gasoline_factor():
+    assert vehicle_parameters({"fuel_type": "hydrogen"})[1] == EMISSION_FACTORS["gasoline"]
+
+
+def test_one_vehicle_over_many_distances():
+    vehicle = {"fuel_type": "gasoline", "efficiency": 10}
+    assert emissions_kg([10, 20, 30], vehicle).tolist() == pytest.approx([2.31, 4.62, 6.93])
+
+
+def test_many_vehicles_over_one_distance():
+    vehicles = [{"fuel_type": "gasoline", "efficiency": 10}, {"fuel_type": "diesel", "efficiency": 20}]
+    assert emissions_kg(100, vehicles).tolist() == pytest.approx([23.1, 13.4])
+
+
+def test_distances_paired_with_vehicles():
+    vehicles = [{"fuel_type": "gasoline", "efficiency": 10}, {"fuel_type": "diesel", "efficiency": 20}]
+    assert emissions_kg([10, 40], vehicles).tolist() == pytest.approx([2.31, 5.36])
+
+
+def test_estimate_emissions_units():
+    estimate = estimate_emissions(50, {"fuel_type": "gasoline", "efficiency": 10})
+    assert estimate["carbon_kg"] == pytest.approx(11.55)
+    assert estimate["carbon_g"] == pytest.approx(11550)
+
+
+def test_calibration_stats():
+    stats = CalibrationStats()
+    assert stats.stats() == {"samples": 0, "mean_remote_to_local_ratio": None, "last": None}
+    stats.record(2.0, 3.0)
+    stats.record(4.0, 4.0)
+    stats.record(0.0, 1.0)
+    result = stats.stats()
+    assert result["samples"] == 2
+    assert result["mean_remote_to_local_ratio"] == 1.25
+    assert result["last"] == {"local_kg": 4.0, "remote_kg": 4.0}
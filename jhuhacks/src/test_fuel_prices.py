@@ -0,0 +1,111 @@
+import sqlite3
+import time
+
+import pytest
+
+from fuel_prices import FuelPriceStore
+
+
+class FakeResponse:
+    def __init__(self, status_code, rows=None):
+        self.status_code = status_code
+        self.rows = rows or []
+
+    def json(self):
+        return {"response": {"data": self.rows}}
+
+
+class FakeClient:
+    """Returns the queued responses in order and remembers the params sent."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append(params)
+        return self.responses.pop(0)
+
+
+def row(period, value, product="EPMR", area="NUS"):
+    return {"period": period, "product": product, "duoarea": area, "value": str(value)}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+def test_refresh_requests_only_tracked_series(db_path):
+    client = FakeClient([FakeResponse(200, [row("2024-01-08", 3.1)])])
+    store = FuelPriceStore(db_path, client, page_size=10)
+    assert store.refresh("key")
+    params = client.calls[0]
+    assert params["facets[product][]"] == ["EPMR"]
+    assert params["facets[duoarea][]"] == ["NUS"]
+    assert store.latest() == {"price_per_gallon": 3.1, "period": "2024-01-08"}
+
+
+def test_refresh_pages_until_short_page(db_path):
+    client = FakeClient([
+        FakeResponse(200, [row("2024-01-15", 3.2), row("2024-01-08", 3.1)]),
+        FakeResponse(200, [row("2024-01-01", 3.0)])
+    ])
+    store = FuelPriceStore(db_path, client, page_size=2)
+    assert store.refresh("key")
+    assert [params["offset"] for params in client.calls] == [0, 2]
+    assert len(store.history()) == 3
+
+
+def test_refresh_starts_from_newest_stored_period(db_path):
+    client = FakeClient([FakeResponse(200, [row("2024-01-08", 3.1)]), FakeResponse(200, [])])
+    store = FuelPriceStore(db_path, client, page_size=10)
+    store.refresh("key")
+    assert store.refresh("key", force=True)
+    assert client.calls[1]["start"] == "2024-01-08"
+
+
+def test_failed_refresh_backs_off(db_path):
+    client = FakeClient([FakeResponse(500), FakeResponse(200, [row("2024-01-08", 3.1)])])
+    store = FuelPriceStore(db_path, client, retry_interval=900)
+    assert not store.refresh("key")
+    assert store.is_stale()
+    assert not store.is_due("key")
+    assert not store.refresh("key")
+    assert len(client.calls) == 1
+
+    store.retry_interval = 0
+    assert store.refresh("key")
+    assert not store.is_stale()
+
+
+def test_failed_key_does_not_hold_back_other_keys(db_path):
+    client = FakeClient([FakeResponse(403), FakeResponse(200, [row("2024-01-08", 3.1)])])
+    store = FuelPriceStore(db_path, client, retry_interval=900)
+    assert not store.refresh("bad-key")
+    assert not store.is_due("bad-key")
+    assert store.is_due("good-key")
+    assert store.refresh("good-key")
+
+
+def test_failure_that_cannot_be_recorded_does_not_raise(db_path, monkeypatch):
+    store = FuelPriceStore(db_path, FakeClient([FakeResponse(500)]))
+
+    def locked(key, value):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(store, "_set_meta", locked)
+    assert not store.refresh("key")
+
+
+def test_refresh_in_background_only_when_due(db_path):
+    client = FakeClient([FakeResponse(200, [row("2024-01-08", 3.1)])])
+    store = FuelPriceStore(db_path, client)
+    assert not store.refresh_in_background(None)
+    assert store.refresh_in_background("key")
+    for _ in range(100):
+        if store.latest() is not None:
+            break
+        time.sleep(0.01)
+    assert store.latest()["price_per_gallon"] == 3.1
+    assert not store.refresh_in_background("key")
@@ -0,0 +1,46 @@
+from array import array
+
+import numpy as np
+
+from geometry import as_points, encode_polyline, sample_along, simplify, zoom_tolerance
+
+
+def test_as_points_views_flat_array():
+    coordinates = array('d', [39.0, -76.0, 39.1, -76.1])
+    points = as_points(coordinates)
+    assert points.shape == (2, 2)
+    assert points.tolist() == [[39.0, -76.0], [39.1, -76.1]]
+
+
+def test_zoom_tolerance_halves_per_zoom_level():
+    assert zoom_tolerance(0) == 360.0 / 256
+    assert zoom_tolerance(11) == zoom_tolerance(10) / 2
+    assert zoom_tolerance(10, tolerance_px=2) == 2 * zoom_tolerance(10)
+
+
+def test_simplify_drops_collinear_points():
+    points = np.array([[0.0, 0.0], [1.0, 1.0], [2.0, 2.0], [3.0, 3.0]])
+    assert simplify(points, 0.01).tolist() == [[0.0, 0.0], [3.0, 3.0]]
+
+
+def test_simplify_keeps_points_beyond_tolerance():
+    points = np.array([[0.0, 0.0], [1.0, 0.52], [2.0, 1.0], [3.0, 0.0], [4.0, 0.0]])
+    simplified = simplify(points, 0.1)
+    assert simplified.tolist() == [[0.0, 0.0], [2.0, 1.0], [3.0, 0.0], [4.0, 0.0]]
+    assert simplify(points, 0).tolist() == points.tolist()
+
+
+def test_encode_polyline_reference_example():
+    # Example from Google's encoded polyline format documentation
+    points = np.array([[38.5, -120.2], [40.7, -120.95], [43.252, -126.453]])
+    assert encode_polyline(points) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_sample_along_is_evenly_spaced_by_distance():
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [4.0, 0.0]])
+    assert sample_along(points, 3).tolist() == [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0]]
+
+
+def test_sample_along_degenerate_inputs():
+    assert len(sample_along(np.array([[0.0, 0.0], [1.0, 0.0]]), 0)) == 0
+    assert len(sample_along(np.array([[0.0, 0.0]]), 3)) == 0
@@ -0,0 +1,139 @@
+import threading
+import time
+
+import pytest
+import requests
+
+import provider_client
+from provider_client import CircuitBreaker, ProviderClient
+
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class FakeSession:
+    """Returns (or raises) the queued outcomes in order, one per request."""
+
+    def __init__(self, outcomes, delay=0):
+        self.outcomes = list(outcomes)
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        with self.lock:
+            self.calls += 1
+            outcome = self.outcomes.pop(0) if self.outcomes else 200
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return FakeResponse(outcome)
+
+
+def make_client(outcomes, **kwargs):
+    client = ProviderClient("test", backoff=0, **kwargs)
+    client.session = FakeSession(outcomes)
+    return client
+
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+        assert breaker.state == "closed"
+        assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_breaker_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+
+def test_breaker_half_open_allows_single_trial(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_trial_success_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+
+
+def test_breaker_half_open_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    clock.now += 30
+    assert breaker.allow()
+
+
+@pytest.mark.parametrize("status", sorted(provider_client.RETRYABLE_STATUS))
+def test_retries_retryable_status(clock, status):
+    client = make_client([status, 200], retries=2)
+    response = client.get("http://provider")
+    assert response.status_code == 200
+    assert client.session.calls == 2
+    assert client.retried == 1
+    assert client.successes == 1
+
+
+def test_does_not_retry_client_errors(clock):
+    client = make_client([401], retries=2)
+    response = client.get("http://provider")
+    assert response.status_code == 401
+    assert client.session.calls == 1
+    assert client.breaker.failures == 0
+
+
+def test_retries_connection_errors(clock):
+    client = make_client([requests.ConnectionError("down"), 200], retries=1)
+    assert client.get("http://provider").status_code == 200
+    assert client.session.calls == 2
+
+
+def test_gives_up_after_retries_and_trips_breaker(clock):
+    client = make_client([503] * 10, retries=2, failure_threshold=1)
+    response = client.get("http://provider")
+    assert response.status_code == 503
+    assert client.session.calls == 3
+    assert client.failures == 1
+    assert client.breaker.state == "open"
+
+
+def test_open_breaker_short_circuits(clock):
+    client = make_client([503] * 10, retries=0, failure_threshold=1)
+    client.get("http://provider")
+    assert client.get("http://provider") is None
+    assert client.session.calls == 1
+    assert client.short_circuited == 1
+
+
+def test_hedged_request_used_when_first_is_slow():
+    client = ProviderClient("test", backoff=0, retries=0, hedge_after=0.01)
+    client.session = FakeSession([200, 200], delay=0.05)
+    response = client.post("http://provider", hedge=True)
+    assert response.status_code == 200
+    assert client.hedged == 1
+    assert client.session.calls == 2
@@ -0,0 +1,107 @@
+import importlib
+import os
+import time
+
+import pytest
+
+from recommendation_cache import RecommendationCache
+
+VEHICLE = {"type": "gasoline_vehicle", "efficiency": 15.0, "fuel_type": "gasoline"}
+WEATHER = {"temperature": 20.0, "weather": "clear sky", "wind_speed": 3.0}
+ENERGY = {"price_per_gallon": 3.1, "period": "2024-01-08"}
+
+
+def key(distance_km=10.0, carbon_kg=2.0, weather="clear sky", vehicle=VEHICLE):
+    return RecommendationCache.key({"distance_km": distance_km}, {"carbon_kg": carbon_kg},
+                                   {"weather": weather}, {"weather": weather}, vehicle)
+
+
+def test_trips_in_the_same_bands_share_a_key():
+    assert key(6.0, 1.5) == key(14.9, 2.9)
+    assert key(6.0, 1.5) != key(16.0, 1.5)
+    assert key(6.0, 1.5) != key(6.0, 3.5)
+
+
+def test_key_depends_on_weather_and_vehicle():
+    assert key(weather="Clear Sky") == key(weather="clear sky")
+    assert key(weather="light rain") != key()
+    assert key(vehicle={**VEHICLE, "fuel_type": "diesel"}) != key()
+    assert key(vehicle={**VEHICLE, "efficiency": 30.0}) == key()
+
+
+def test_entries_expire_after_ttl():
+    cache = RecommendationCache(ttl=60)
+    cache.put(key(), "1. Drive less.")
+    assert cache.get(key()) == "1. Drive less."
+    cache.entries[key()] = (time.time() - 60, "1. Drive less.")
+    assert cache.get(key()) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_bound():
+    cache = RecommendationCache(max_entries=2)
+    cache.put(key(1.0), "a")
+    cache.put(key(10.0), "b")
+    cache.get(key(1.0))
+    cache.put(key(20.0), "c")
+    assert cache.get(key(10.0)) is None
+    assert cache.get(key(1.0)) == "a"
+    assert cache.get(key(20.0)) == "c"
+
+
+@pytest.fixture(scope="module")
+def app_module(tmp_path_factory):
+    os.environ.setdefault("CACHE_DB_PATH", str(tmp_path_factory.mktemp("cache") / "cache.sqlite3"))
+    return importlib.import_module("GreenAIModel")
+
+
+@pytest.fixture
+def model(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "recommendation_cache", RecommendationCache())
+    return app_module
+
+
+def run_events(model, **kwargs):
+    route = {"distance_km": 10.0, "duration_minutes": 20}
+    return list(model.recommendation_events(route, ENERGY, {"carbon_kg": 2.0}, WEATHER, WEATHER, VEHICLE,
+                                            **kwargs))
+
+
+def stream_of(*chunks):
+    def stream(prompt, credentials=None):
+        yield from chunks
+    return stream
+
+
+def test_finished_stream_is_cached(model, monkeypatch):
+    monkeypatch.setattr(model, "stream_openai_recommendation",
+                        stream_of(("1. Drive", None), (" less.", None), (None, "stop")))
+    events = run_events(model, stream=True)
+    assert events == [("token", "1. Drive"), ("token", " less."), ("recommendation", "1. Drive less.")]
+    assert model.recommendation_cache.stats()["entries"] == 1
+    assert run_events(model, stream=True) == [("recommendation", "1. Drive less.")]
+
+
+@pytest.mark.parametrize("chunks", [
+    [("1. Drive", None), (" le", None)],
+    [("1. Drive", None), (" less", "length")],
+])
+def test_failed_or_truncated_stream_is_not_cached(model, monkeypatch, chunks):
+    monkeypatch.setattr(model, "stream_openai_recommendation", stream_of(*chunks))
+    events = run_events(model, stream=True)
+    assert events[-1] == ("recommendation", model.RECOMMENDATION_FAILED)
+    assert model.recommendation_cache.stats()["entries"] == 0
+
+
+def test_stream_past_deadline_is_not_cached(model, monkeypatch):
+    monkeypatch.setattr(model, "stream_openai_recommendation",
+                        stream_of(("1. Drive", None), (" less.", "stop")))
+    events = run_events(model, stream=True, deadline=time.monotonic() - 1)
+    assert events == [("token", "1. Drive"), ("recommendation", model.RECOMMENDATION_FAILED)]
+    assert model.recommendation_cache.stats()["entries"] == 0
+
+
+def test_failed_blocking_call_is_not_cached(model, monkeypatch):
+    monkeypatch.setattr(model, "get_openai_recommendation", lambda prompt, credentials=None: None)
+    assert run_events(model) == [("recommendation", model.RECOMMENDATION_FAILED)]
+    assert model.recommendation_cache.stats()["entries"] == 0
@@ -0,0 +1,71 @@
+from array import array
+
+from route_cache import RouteCache
+
+
+def make_route(points=10):
+    return {
+        "distance_km": 12.5,
+        "duration_minutes": 20,
+        "coordinates": array('d', [39.0 + i * 0.001 for i in range(points * 2)]),
+        "directions": ["Head north", "Turn right"]
+    }
+
+
+def make_cache(tmp_path, **kwargs):
+    return RouteCache(str(tmp_path / "cache.sqlite3"), **kwargs)
+
+
+def test_key_snaps_to_grid(tmp_path):
+    cache = make_cache(tmp_path, grid=0.001)
+    assert cache.key([39.29041, -76.61219], [38.9072, -77.0369], "driving-car") == \
+        cache.key([39.29039, -76.61221], [38.90721, -77.03689], "driving-car")
+    assert cache.key([39.29, -76.61], [38.90, -77.03], "driving-car") != \
+        cache.key([39.29, -76.61], [38.90, -77.03], "cycling-regular")
+
+
+def test_memory_then_disk_hit(tmp_path, clock):
+    cache = make_cache(tmp_path)
+    cache.put("k", make_route())
+    assert cache.get("k")["distance_km"] == 12.5
+    assert cache.memory_hits == 1
+
+    # A second cache on the same file (another worker) reads it from SQLite
+    other = make_cache(tmp_path)
+    route = other.get("k")
+    assert route["coordinates"] == make_route()["coordinates"]
+    assert route["directions"] == ["Head north", "Turn right"]
+    assert other.disk_hits == 1
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("k", make_route())
+    clock.now += 60
+    assert cache.get("k") is None
+    assert cache.expirations == 1
+    assert cache.misses == 1
+
+
+def test_lru_evicts_least_recently_used(tmp_path, clock):
+    size = RouteCache._size(make_route())
+    cache = make_cache(tmp_path, max_bytes=size * 2)
+    cache.put("a", make_route())
+    cache.put("b", make_route())
+    cache.get("a")
+    cache.put("c", make_route())
+    assert list(cache.entries) == ["a", "c"]
+    assert cache.evictions == 1
+    assert cache.current_bytes <= cache.max_bytes
+
+
+def test_purge_expired_clears_both_tiers(tmp_path, clock):
+    cache = make_cache(tmp_path, ttl=60)
+    cache.put("old", make_route())
+    clock.now += 30
+    cache.put("new", make_route())
+    clock.now += 40
+    assert cache.purge_expired() == 1
+    assert list(cache.entries) == ["new"]
+    assert cache.current_bytes == RouteCache._size(make_route())
+    assert make_cache(tmp_path, ttl=60).get("new") is not None
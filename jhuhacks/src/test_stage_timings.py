@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from stage_timings import StageMetrics, mark_completed, server_timing_header
+
+
+def test_server_timing_header_in_milliseconds():
+    assert server_timing_header({"route": 0.25, "llm": 1.5}) == "route;dur=250.0, llm;dur=1500.0"
+
+
+def test_stage_metrics_aggregates():
+    metrics = StageMetrics()
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        metrics.record({"route": seconds})
+    stats = metrics.stats()["route"]
+    assert stats["count"] == 4
+    assert stats["avg_ms"] == 250.0
+    assert stats["p50_ms"] == 300.0
+    assert stats["max_ms"] == 400.0
+
+
+def test_stage_metrics_keeps_recent_samples_only():
+    metrics = StageMetrics(sample_size=2)
+    for seconds in (5.0, 0.1, 0.2):
+        metrics.record({"route": seconds})
+    stats = metrics.stats()["route"]
+    assert stats["count"] == 3
+    assert stats["max_ms"] == 200.0
+
+
+def test_mark_completed_stamps_when_work_finished():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(time.sleep, 0.01)
+        future.add_done_callback(mark_completed)
+        future.result()
+        time.sleep(0.05)
+    assert time.monotonic() - future.completed_at >= 0.05
+
+
+def test_mark_completed_on_finished_future_stamps_now():
+    future = Future()
+    future.set_result(None)
+    before = time.monotonic()
+    future.add_done_callback(mark_completed)
+    assert future.completed_at >= before
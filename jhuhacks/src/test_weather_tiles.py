@@ -0,0 +1,101 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from weather_tiles import WeatherTileCache, geohash, geohash_center
+
+
+GOOD = {"WEATHER_API_KEY": "good-key"}
+BAD = {"WEATHER_API_KEY": "bad-key"}
+
+
+class FakeWeather:
+    """Shaped like get_weather_data: counts lookups, holds each one until `release`
+    is set, and fails (returns None) for the bad key."""
+
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, lat, lon, credentials=None):
+        self.calls.append((lat, lon, (credentials or {}).get("WEATHER_API_KEY")))
+        self.release.wait(5)
+        if credentials == BAD:
+            return None
+        return {"temperature": 20.0, "weather": "clear sky", "wind_speed": 3.0}
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        yield executor
+
+
+def test_geohash_known_value():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+
+
+def test_geohash_center_lies_in_tile():
+    tile = geohash(39.2904, -76.6122, 5)
+    lat, lon = geohash_center(tile)
+    assert geohash(lat, lon, 5) == tile
+    assert abs(lat - 39.2904) < 0.05 and abs(lon - -76.6122) < 0.05
+
+
+def test_points_in_one_tile_share_a_lookup(executor):
+    fetch = FakeWeather()
+    cache = WeatherTileCache(fetch, executor)
+    futures = cache.futures([(39.2904, -76.6122), (39.2905, -76.6121), (38.9072, -77.0369)])
+    assert futures[0] is futures[1]
+    assert futures[0] is not futures[2]
+    assert [future.result(5)["temperature"] for future in futures] == [20.0] * 3
+    assert len(fetch.calls) == 2
+
+
+def test_pending_lookup_is_coalesced_across_requests(executor):
+    fetch = FakeWeather()
+    fetch.release.clear()
+    cache = WeatherTileCache(fetch, executor)
+    first = cache.futures([(39.2904, -76.6122)], GOOD)[0]
+    second = cache.futures([(39.2904, -76.6122)], GOOD)[0]
+    assert first is second
+    fetch.release.set()
+    assert second.result(5) is not None
+    assert len(fetch.calls) == 1
+    assert cache.stats()["coalesced"] == 1
+
+
+def test_pending_lookup_is_not_shared_across_api_keys(executor):
+    fetch = FakeWeather()
+    fetch.release.clear()
+    cache = WeatherTileCache(fetch, executor)
+    bad = cache.futures([(39.2904, -76.6122)], BAD)[0]
+    good = cache.futures([(39.2904, -76.6122)], GOOD)[0]
+    assert bad is not good
+    fetch.release.set()
+    assert bad.result(5) is None
+    assert good.result(5)["weather"] == "clear sky"
+    assert sorted(key for _, _, key in fetch.calls) == ["bad-key", "good-key"]
+
+
+def test_cached_tile_is_shared_across_api_keys(executor):
+    fetch = FakeWeather()
+    cache = WeatherTileCache(fetch, executor)
+    cache.futures([(39.2904, -76.6122)], GOOD)[0].result(5)
+    assert cache.futures([(39.2904, -76.6122)], BAD)[0].result(5)["temperature"] == 20.0
+    assert len(fetch.calls) == 1
+
+
+def test_tiles_expire_after_ttl(executor, clock):
+    fetch = FakeWeather()
+    cache = WeatherTileCache(fetch, executor, ttl=600)
+    cache.futures([(39.2904, -76.6122)])[0].result(5)
+
+    assert cache.futures([(39.2904, -76.6122)])[0].result(5) is not None
+    assert cache.stats()["hits"] == 1
+
+    clock.now += 600
+    cache.futures([(39.2904, -76.6122)])[0].result(5)
+    assert len(fetch.calls) == 2
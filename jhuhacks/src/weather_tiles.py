@@ -0,0 +1,139 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from stage_timings import mark_completed
+
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def geohash(lat, lon, precision=5):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        interval, coordinate = (lon_range, lon) if even else (lat_range, lat)
+        mid = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if coordinate >= mid:
+            value |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_center(tile):
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in tile:
+        value = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            mid = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = mid
+            else:
+                interval[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+class WeatherTileCache:
+    """Short-lived weather observations shared per geohash tile.
+
+    Every lookup is snapped to the centre of its tile, so nearby requests and
+    points sampled along the same route resolve to one provider call. Lookups
+    for a tile that is already being fetched with the same API key wait on the
+    in-flight call instead of issuing another one; a request with a different
+    key makes its own call, so one user's key is never spent on (or failing
+    for) another's lookups. Cached observations are shared by everyone.
+    `futures` must be called from request threads, not from tasks running on
+    `executor`.
+    """
+
+    def __init__(self, fetch, executor, precision=5, ttl=600, max_entries=10000):
+        self.fetch = fetch
+        self.executor = executor
+        self.precision = precision
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.pending = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def futures(self, points, credentials=None):
+        # One future per (lat, lon) point; points in the same tile share a future
+        by_tile = {}
+        results = []
+        for lat, lon in points:
+            tile = geohash(lat, lon, self.precision)
+            if tile not in by_tile:
+                by_tile[tile] = self._future(tile, credentials)
+            results.append(by_tile[tile])
+        return results
+
+    def _future(self, tile, credentials):
+        with self.lock:
+            entry = self.entries.get(tile)
+            if entry is not None and time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                future = Future()
+                future.set_result(entry[1])
+                future.add_done_callback(mark_completed)
+                return future
+
+            # Pending futures are shared between requests, so waiters must never cancel them
+            pending_key = (tile, (credentials or {}).get("WEATHER_API_KEY"))
+            future = self.pending.get(pending_key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+
+            self.misses += 1
+            future = self.executor.submit(self._load, tile, credentials, pending_key)
+            future.add_done_callback(mark_completed)
+            self.pending[pending_key] = future
+            return future
+
+    def _load(self, tile, credentials, pending_key):
+        try:
+            lat, lon = geohash_center(tile)
+            weather = self.fetch(lat, lon, credentials)
+            if weather is not None:
+                with self.lock:
+                    self.entries[tile] = (time.time(), weather)
+                    if len(self.entries) > self.max_entries:
+                        self._evict()
+            return weather
+        finally:
+            with self.lock:
+                self.pending.pop(pending_key, None)
+
+    def _evict(self):
+        # Drop expired tiles, then the oldest ones if still over the limit
+        cutoff = time.time() - self.ttl
+        for tile in [tile for tile, (fetched, _) in self.entries.items() if fetched < cutoff]:
+            del self.entries[tile]
+        while len(self.entries) > self.max_entries:
+            del self.entries[next(iter(self.entries))]
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "tiles": len(self.entries)
+            }
@@ -0,0 +1,5 @@
+# Production entry point, e.g. from this directory:
+#   gunicorn -c gunicorn.conf.py wsgi:app
+from GreenAIModel import create_app
+
+app = create_app()